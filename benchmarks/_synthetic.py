@@ -0,0 +1,14 @@
+# Test images shared by the benchmarks (imported as a sibling of the script being run)
+
+from PIL import Image, ImageDraw
+
+
+def make_image(width):
+    # 4:3 photo-like test image (gradient + shapes so the encoder has real work to do)
+    height = width * 3 // 4
+    img = Image.linear_gradient("L").resize((width, height)).convert("RGB")
+    draw = ImageDraw.Draw(img)
+    for i in range(0, width, max(1, width // 40)):
+        draw.ellipse((i, i * height // width, i + width // 10, i * height // width + height // 10),
+                     fill=(i % 255, 90, 200))
+    return img
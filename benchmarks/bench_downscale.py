@@ -0,0 +1,95 @@
+# Benchmark: full decode + LANCZOS (old compress_logic) vs open_downscaled (draft/reduce).
+# Each case runs in a fresh process so peak RSS is measured per case.
+# Linux reads VmHWM from /proc (ru_maxrss would be inherited from the parent);
+# elsewhere it falls back to ru_maxrss, which is only approximate.
+#
+#   python benchmarks/bench_downscale.py [--sizes 12,24,48] [--width 1920]
+
+import argparse
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from PIL import Image
+
+from _synthetic import make_image
+
+
+def make_jpeg(path, megapixels):
+    img = make_image(int((megapixels * 1e6 * 4 / 3) ** 0.5))
+    img.save(path, quality=92)
+    return img.size
+
+
+def _old_path(path, max_width):
+    img = Image.open(path)
+    ratio = max_width / float(img.width)
+    return img.resize((max_width, int(img.height * ratio)), Image.Resampling.LANCZOS)
+
+
+def _new_path(path, max_width):
+    from universal_converter.engine import open_downscaled
+    return open_downscaled(path, max_width)
+
+
+def _rss_mb(field):
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    # ru_maxrss is KB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1024.0 if sys.platform != "darwin" else rss / (1024.0 * 1024.0)
+
+
+def _reset_peak():
+    # Linux: make VmHWM restart from the current RSS
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def _case(args):
+    name, path, max_width = args
+    func = _old_path if name == "full decode" else _new_path
+    import universal_converter.engine  # keep import cost out of both measurements
+    _reset_peak()
+    base_rss = _rss_mb("VmRSS")
+    start = time.perf_counter()
+    func(path, max_width).load()
+    elapsed = time.perf_counter() - start
+    # Growth of the high-water mark over the post-import baseline
+    return elapsed, _rss_mb("VmHWM") - base_rss
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="12,24,48", help="Megapixel sizes to test")
+    parser.add_argument("--width", type=int, default=1920, help="max_width of the level under test")
+    args = parser.parse_args()
+
+    ctx = multiprocessing.get_context("spawn")
+    print(f"{'MP':>4} {'path':<12} {'wall s':>8} {'ms/MP':>8} {'peak RSS +MB':>12}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for mp in [float(s) for s in args.sizes.split(",")]:
+            path = os.path.join(tmp, f"{mp:g}mp.jpg")
+            w, h = make_jpeg(path, mp)
+            real_mp = w * h / 1e6
+            for name in ("full decode", "downscaled"):
+                with ctx.Pool(1) as pool:
+                    elapsed, rss = pool.apply(_case, ((name, path, args.width),))
+                print(f"{mp:>4g} {name:<12} {elapsed:>8.3f} {elapsed * 1000 / real_mp:>8.1f} {rss:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
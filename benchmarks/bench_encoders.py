@@ -0,0 +1,88 @@
+# Benchmark: WebP/AVIF output size vs. encode time for every effort tier (EFFORTS).
+# Each format/tier is encoded from the same decoded image, best of --repeat runs.
+# With --chart, a bytes-vs-seconds scatter is saved as PNG (needs matplotlib).
+#
+#   python benchmarks/bench_encoders.py [photo.jpg] [--width 1920] [--quality 75] [--chart out.png]
+
+import argparse
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from PIL import Image, features
+
+from _synthetic import make_image
+from universal_converter.engine import EFFORTS, encoder_options
+
+
+def encode(img, fmt, quality, effort, lossless):
+    buf = io.BytesIO()
+    options = {"quality": quality}
+    options.update(encoder_options(fmt, effort, lossless))
+    start = time.perf_counter()
+    img.save(buf, format=fmt.upper(), **options)
+    return len(buf.getvalue()), time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("image", nargs="?", help="Source image (default: generated)")
+    parser.add_argument("--width", type=int, default=1920, help="Resize the source to this width first")
+    parser.add_argument("--quality", type=int, default=75)
+    parser.add_argument("--repeat", type=int, default=2)
+    parser.add_argument("--lossless", action="store_true", help="Also time lossless WebP")
+    parser.add_argument("--chart", help="Save a bytes vs. encode time chart to this PNG")
+    args = parser.parse_args()
+
+    if args.image:
+        img = Image.open(args.image).convert("RGB")
+        if img.width > args.width:
+            img = img.resize((args.width, img.height * args.width // img.width), Image.Resampling.LANCZOS)
+    else:
+        img = make_image(args.width)
+    img.load()
+
+    cases = [("webp", False)] + ([("webp", True)] if args.lossless else [])
+    if features.check("avif"):
+        cases.append(("avif", False))
+    else:
+        print("AVIF: not supported by this Pillow build, skipped")
+
+    print(f"{img.width}x{img.height}, quality {args.quality}")
+    print(f"{'format':<14} {'effort':<9} {'bytes':>10} {'encode s':>9} {'vs balanced':>12}")
+    points = []
+    for fmt, lossless in cases:
+        name = fmt + (" lossless" if lossless else "")
+        rows = {}
+        for effort in EFFORTS:
+            runs = [encode(img, fmt, args.quality, effort, lossless) for _ in range(args.repeat)]
+            rows[effort] = (runs[0][0], min(t for _, t in runs))
+        base = rows["balanced"][0]
+        for effort, (size, seconds) in rows.items():
+            print(f"{name:<14} {effort:<9} {size:>10} {seconds:>9.3f} {size / float(base):>11.0%}")
+            points.append((name, effort, size, seconds))
+
+    if args.chart:
+        import matplotlib
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+        fig, ax = plt.subplots(figsize=(7, 4.5))
+        for name in dict.fromkeys(p[0] for p in points):
+            series = [p for p in points if p[0] == name]
+            ax.plot([p[3] for p in series], [p[2] / 1024.0 for p in series], marker="o", label=name)
+            for _, effort, size, seconds in series:
+                ax.annotate(effort, (seconds, size / 1024.0), textcoords="offset points", xytext=(4, 4))
+        ax.set_xlabel("encode time (s)")
+        ax.set_ylabel("output size (KB)")
+        ax.set_title(f"Effort tiers, {img.width}x{img.height}, quality {args.quality}")
+        ax.legend()
+        fig.tight_layout()
+        fig.savefig(args.chart)
+        print(f"Chart saved to {args.chart}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+# Cold-start guard for the GUI, based on `python -X importtime`.
+# Runs exactly the top-level imports of converter-V.2.0.0.py (without building
+# the window) plus `import universal_converter`, prints the slowest modules and
+# fails when a heavy library is imported at startup or the budget is exceeded.
+#
+#   python benchmarks/bench_importtime.py [--budget-ms 400] [--top 10]
+
+import argparse
+import ast
+import os
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+GUI_SCRIPT = os.path.join(ROOT, "converter-V.2.0.0.py")
+
+# Must only be imported when the tab/function that needs them runs.
+# (PIL itself is not listed: customtkinter imports it for CTkImage.)
+LAZY_MODULES = ["pillow_heif", "pypdf", "yt_dlp", "moviepy", "numpy", "webbrowser"]
+
+
+def startup_imports():
+    with open(GUI_SCRIPT, encoding="utf-8") as f:
+        source = f.read()
+    tree = ast.parse(source)
+    lines = [ast.get_source_segment(source, node) for node in tree.body
+             if isinstance(node, (ast.Import, ast.ImportFrom))]
+    return "\n".join(lines + ["import universal_converter"])
+
+
+def measure(code):
+    # Returns [(module, self_us, cumulative_us)] for top-level modules
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                          cwd=ROOT, capture_output=True, text=True)
+    if proc.returncode != 0:
+        sys.exit(proc.stderr)
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((name.rstrip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--budget-ms", type=float, default=400.0, help="Max total import time")
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    rows = measure(startup_imports())
+    top_level = [(name.strip(), cum) for name, _, cum in rows if not name.startswith("  ")]
+    total_ms = sum(cum for _, cum in top_level) / 1000.0
+    loaded = {name.strip() for name, _, _ in rows}
+
+    print(f"{'module':<40} {'cumulative ms':>14}")
+    for name, cum in sorted(top_level, key=lambda r: -r[1])[:args.top]:
+        print(f"{name:<40} {cum / 1000.0:>14.1f}")
+    print(f"{'TOTAL':<40} {total_ms:>14.1f}  (budget {args.budget_ms:.0f} ms)")
+
+    eager = [m for m in LAZY_MODULES if m in loaded]
+    failed = False
+    if eager:
+        print(f"FAIL: imported at startup: {', '.join(eager)}")
+        failed = True
+    if total_ms > args.budget_ms:
+        print("FAIL: startup imports over budget")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
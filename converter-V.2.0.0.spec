@@ -1,4 +1,5 @@
 # -*- mode: python ; coding: utf-8 -*-
+import shutil
 from PyInstaller.utils.hooks import collect_all
 
 datas = []
@@ -9,6 +10,15 @@ datas += tmp_ret[0]; binaries += tmp_ret[1]; hiddenimports += tmp_ret[2]
 tmp_ret = collect_all('pillow_heif')
 datas += tmp_ret[0]; binaries += tmp_ret[1]; hiddenimports += tmp_ret[2]
 
+# jpegtran (libjpeg-turbo) is what makes "Low" shrink JPEGs; without it only the
+# metadata is removed. Bundled from the build machine's PATH (its DLLs are picked up
+# by the dependency analysis); see find_jpegtran in universal_converter/jpeg.py.
+jpegtran = shutil.which('jpegtran')
+if jpegtran:
+    binaries.append((jpegtran, '.'))
+else:
+    print('WARNING: jpegtran is not on PATH; the build will not include it')
+
 
 a = Analysis(
     ['converter-V.2.0.0.py'],
@@ -0,0 +1,42 @@
+# Universal Converter engine: conversion and compression logic without the Tk UI.
+# The GUI (converter-V.2.0.0.py) and the CLI (python -m universal_converter) both use this.
+
+from .engine import (
+    IMAGE_EXTS,
+    VIDEO_EXTS,
+    COMPRESS_EXTS,
+    LEVELS,
+    VIDEO_LEVELS,
+    EFFORTS,
+    SAME_FORMAT_ROUTES,
+    PDF_IMAGE_DPI,
+    load_pil,
+    level_key,
+    effort_key,
+    atomic_output,
+    job_result,
+    result_error,
+    format_bytes,
+    convert_image,
+    convert_media,
+    image_targets,
+    convert_image_targets,
+    process_conversion,
+    compress_logic,
+    compress_ladder,
+    video_sheet,
+    cascade_resize,
+    collect_inputs,
+    run_batch,
+)
+from .bands import ImageTooLarge
+from .cache import ResultCache, default_cache_dir
+from .jobs import JobScheduler, Job, Cancelled
+
+
+def __getattr__(name):
+    # compress_pdf pulls in pypdf, so it is only imported when asked for
+    if name == "compress_pdf":
+        from .pdf import compress_pdf
+        return compress_pdf
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,243 @@
+import argparse
+import os
+import sys
+
+from .engine import (LEVELS, EFFORTS, SHEET_FRAMES, SHEET_COLUMNS, DEFAULT_EFFORT, SAME_FORMAT_ROUTES, run_batch,
+                     result_error, format_bytes)
+from .cache import ResultCache, DEFAULT_MAX_BYTES
+from .youtube import RES_MAP, DEFAULT_WORKERS, DEFAULT_FRAGMENTS
+
+CONVERT_FORMATS = ["jpg", "png", "webp", "avif", "mp4", "mkv", "mp3", "wav"]
+IMAGE_FORMATS = ["jpg", "png", "webp", "avif"]
+
+
+def format_list(value):
+    # "jpg,webp" -> ["jpg", "webp"]
+    formats = [f.strip().lower().lstrip(".") for f in value.split(",") if f.strip()]
+    unknown = [f for f in formats if f not in CONVERT_FORMATS]
+    if not formats or unknown:
+        raise argparse.ArgumentTypeError(f"choose from {', '.join(CONVERT_FORMATS)}")
+    return formats
+
+def byte_size(value):
+    # "200KB", "1.5MB", "250000" -> bytes
+    text = value.strip().upper().rstrip("B")
+    units = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+    try:
+        if text and text[-1] in units:
+            return int(float(text[:-1]) * units[text[-1]])
+        return int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError("expected a size like 200KB or 1.5MB")
+
+def width_list(value):
+    # "1920,1280" -> [1920, 1280]
+    try:
+        widths = [int(w) for w in value.split(",") if w.strip()]
+    except ValueError:
+        raise argparse.ArgumentTypeError("expected pixel widths like 1920,1280")
+    if not widths or min(widths) <= 0:
+        raise argparse.ArgumentTypeError("expected pixel widths like 1920,1280")
+    return widths
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m universal_converter",
+                                     description="Batch convert or compress files without the GUI.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    comp = sub.add_parser("compress", help="Compress images, videos and PDFs")
+    comp.add_argument("--level", choices=list(LEVELS), default="medium")
+    comp.add_argument("--target-size", type=byte_size, default=None, metavar="SIZE",
+                      help="Images: best quality that fits under SIZE (e.g. 200KB), "
+                           "shrinking below the level's width only if needed. Videos: two-pass encode to SIZE")
+    comp.add_argument("--no-dither", action="store_true",
+                      help="Extreme PNGs: plain palette mapping instead of Floyd-Steinberg dithering")
+    comp.add_argument("--ladder", action="store_true",
+                      help="Images: write every width of the level table (photo_2560.jpg ... photo_1024.jpg) "
+                           "at the level's quality, plus a photo.ladder.json manifest")
+    conv = sub.add_parser("convert", help="Convert images and videos to another format")
+    conv.add_argument("--to", dest="target", required=True, type=format_list,
+                      help=f"Target format, or several image formats at once (jpg,webp,png). "
+                           f"Choices: {', '.join(CONVERT_FORMATS)}")
+    conv.add_argument("--widths", type=width_list, default=None,
+                      help="Also resize: one image per width and format, e.g. 1920,1280 (images only)")
+
+    thumbs = sub.add_parser("thumbs", help="Poster frames or contact sheets of videos")
+    thumbs.add_argument("-n", "--frames", type=int, default=SHEET_FRAMES,
+                        help="Frames spread over each video; 1 gives a single poster frame")
+    thumbs.add_argument("--columns", type=int, default=SHEET_COLUMNS, help="Frames per row of the sheet")
+    thumbs.add_argument("--format", dest="image_format", choices=IMAGE_FORMATS, default="jpg")
+    thumbs.add_argument("--level", choices=list(LEVELS), default="medium",
+                        help="Sheet width and quality, as for compress (medium: 1920px)")
+
+    dl = sub.add_parser("download", help="Download Youtube videos, playlists or lists of URLs")
+    dl.add_argument("urls", nargs="*", help="Video/playlist/channel URLs or .txt files with one URL per line")
+    dl.add_argument("-o", "--output-dir", default=".", help="Save folder (default: current folder)")
+    dl.add_argument("--format", dest="video_format", choices=["mp4", "mkv", "mp3"], default="mp4")
+    dl.add_argument("--res", dest="resolution", choices=list(RES_MAP), default="1080p")
+    dl.add_argument("-j", "--workers", type=int, default=DEFAULT_WORKERS, help="Videos downloaded at the same time")
+    dl.add_argument("--fragments", type=int, default=DEFAULT_FRAGMENTS,
+                    help="Concurrent fragment downloads per video")
+    dl.add_argument("--no-index", action="store_true",
+                    help="Ignore the folder's download index and fetch everything again")
+    dl.add_argument("--prune", type=float, nargs="?", const=0, metavar="DAYS",
+                    help="Drop index entries whose file is gone (or older than DAYS) and exit")
+
+    cache = sub.add_parser("cache", help="Show result cache statistics or empty it")
+    cache.add_argument("action", choices=["stats", "clear"])
+
+    for p in (comp, conv, thumbs):
+        p.add_argument("inputs", nargs="+", help="Files, directories (recursive) or glob patterns")
+        p.add_argument("-o", "--output-dir", help="Mirror the input tree here (default: next to each source)")
+        p.add_argument("-j", "--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+        p.add_argument("--no-cache", action="store_true", help="Always process, never reuse cached results")
+        p.add_argument("--cache-link", action="store_true", help="Hardlink cached results (and same-format conversions) instead of copying")
+        p.add_argument("--memory-limit", type=int, default=None, metavar="MB",
+                       help="Decoded pixels one image may use; bigger images are processed in bands "
+                            "(PNG, uncompressed/LZW/Deflate/PackBits TIFF, BMP, PPM/PGM) or refused "
+                            "(default 1024, or UC_MEMORY_LIMIT_MB)")
+        p.add_argument("--effort", choices=list(EFFORTS), default=DEFAULT_EFFORT,
+                       help="WebP/AVIF encoder effort: fast (bigger files, for bulk runs) ... best (smallest, slowest)")
+    for p in (comp, conv, thumbs, cache):
+        p.add_argument("--cache-dir", default=None, help="Result cache folder (default: user cache dir)")
+        p.add_argument("--cache-size", type=int, default=DEFAULT_MAX_BYTES // 1024 ** 2,
+                       help="Result cache limit in MB (least recently used results are evicted)")
+    return parser
+
+
+def print_cache_stats(stats):
+    lookups = stats["hits"] + stats["misses"]
+    rate = f"{stats['hits'] / lookups:.0%}" if lookups else "n/a"
+    print(f"Cache: {stats['hits']} hits, {stats['misses']} misses ({rate} hit rate), "
+          f"{format_bytes(stats['bytes_saved'])} served from cache")
+    print(f"       {stats['entries']} entries, {format_bytes(stats['size_bytes'])} of "
+          f"{format_bytes(stats['max_bytes'])}")
+
+
+def download(args):
+    from .youtube import download_youtube_logic, DownloadIndex
+
+    if args.prune is not None:
+        removed = DownloadIndex(args.output_dir).prune(args.prune or None)
+        print(f"Removed {removed} stale index entries.")
+        return 0
+    if not args.urls:
+        print("No URL given.", file=sys.stderr)
+        return 1
+
+    def on_item(index, url, result):
+        if result.startswith("Error"):
+            print(f"FAIL {url}: {result}", file=sys.stderr)
+        elif result.startswith("Skipped"):
+            print(f"SKIP {url}")
+        else:
+            print(f"OK   {url}")
+
+    result = download_youtube_logic(args.urls, args.output_dir, args.video_format, args.resolution,
+                                    workers=args.workers, fragments=args.fragments, on_item=on_item,
+                                    use_index=not args.no_index)
+    if not result["items"]:
+        print(result["error"], file=sys.stderr)
+        return 1
+    done = sum(1 for item in result["items"] if not item["result"].startswith("Error"))
+    print(f"{done}/{len(result['items'])} downloads done.")
+    return 0 if result["ok"] else 1
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command == "download":
+        return download(args)
+
+    cache = None
+    if args.command == "cache" or not args.no_cache:
+        cache = ResultCache(args.cache_dir, args.cache_size * 1024 ** 2,
+                            link=getattr(args, "cache_link", False))
+
+    if args.command == "cache":
+        if args.action == "clear":
+            cache.clear()
+            print("Cache cleared.")
+        else:
+            print_cache_stats(cache.stats())
+        return 0
+
+    task = args.command
+    if task == "compress":
+        option = args.level
+        if args.ladder:
+            task, cache = "ladder", None  # several outputs per input, not cached
+        elif args.target_size:
+            option = (args.level, args.target_size)
+    elif task == "thumbs":
+        if args.frames < 1 or args.columns < 1:
+            print("--frames and --columns must be at least 1.", file=sys.stderr)
+            return 2
+        option = (args.frames, args.columns, args.level, args.image_format)
+        cache = None  # frames are grabbed straight from the video, nothing to reuse
+    elif len(args.target) > 1 or args.widths:
+        # Several outputs per image from a single decode
+        if any(f not in IMAGE_FORMATS for f in args.target):
+            print(f"Several targets or --widths only work with {', '.join(IMAGE_FORMATS)}.", file=sys.stderr)
+            return 2
+        task, option = "derive", (args.target, args.widths)
+    else:
+        option = args.target[0]
+    failed = 0
+
+    def report(input_path, result):
+        nonlocal failed
+        error = result_error(result)
+        if error:
+            failed += 1
+            print(f"FAIL {input_path}: {error}", file=sys.stderr)
+        elif isinstance(result, dict):
+            print(f"OK   {input_path} -> {result['output']}{' (cached)' if result['cached'] else ''} "
+                  f"({format_bytes(result['input_bytes'])} -> {format_bytes(result['output_bytes'])}, "
+                  f"{result['ratio']:.0%}, {result['elapsed']:.2f}s)")
+            if result.get("skipped"):
+                print("     already small: copied unchanged"
+                      + (f" (a re-encode would be ~{format_bytes(result['estimate_bytes'])})"
+                         if result.get("estimate_bytes") else ""))
+            elif result.get("video_bitrate"):
+                print(f"     two-pass at {result['video_bitrate'] // 1000} kb/s video"
+                      + ("" if result["target_met"] else f" - could not get under {format_bytes(result['target_bytes'])}"))
+            elif result.get("target_bytes"):
+                quality = f"quality {result['quality']}, " if result["quality"] else ""
+                print(f"     {quality}{result['width']}px after {result['encodes']} trial encodes"
+                      + ("" if result["target_met"] else f" - could not get under {format_bytes(result['target_bytes'])}"))
+            if result.get("ssim") is not None and result.get("quality"):
+                print(f"     quality {result['quality']}, SSIM {result['ssim']:.4f} after {result['encodes']} trial encodes")
+            if result.get("route") in SAME_FORMAT_ROUTES:
+                print(f"     already {os.path.splitext(result['output'])[1][1:]}: {result['route']}, not re-encoded")
+            if result.get("method"):
+                tool = "Huffman tables optimized by jpegtran" if result["method"] == "jpegtran" else "no jpegtran found"
+                print(f"     lossless: {format_bytes(result['metadata_bytes'])} of metadata removed, {tool}")
+            if result.get("frames"):
+                print(f"     {len(result['frames'])} frames at " + ", ".join(f"{t:.0f}s" for t in result["frames"]))
+            if result.get("files"):
+                print("     " + ", ".join(f"{f['path']} {format_bytes(f['bytes'])}" for f in result["files"]))
+            if result.get("page_savings"):
+                saved = result["page_savings"]
+                print(f"     images: {format_bytes(sum(saved))} saved on {sum(1 for b in saved if b)}"
+                      f"/{len(saved)} pages")
+        else:
+            print(f"OK   {input_path} -> {result}")
+
+    results = run_batch(task, args.inputs, option, args.output_dir, args.workers,
+                        on_result=report, cache=cache, effort=args.effort,
+                        dither=not getattr(args, "no_dither", False), memory_mb=args.memory_limit)
+    if not results:
+        print("No matching input files.", file=sys.stderr)
+        return 1
+    print(f"{len(results) - failed}/{len(results)} files done.")
+    if cache:
+        c = cache.counters
+        print(f"Cache: {c['hits']} hits, {c['misses']} misses, {format_bytes(c['bytes_saved'])} reused.")
+        cache.save_stats()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,310 @@
+import io
+import os
+import math
+import zlib
+import struct
+
+# Limits for very large images (gigapixel scans).
+# Opening an image only reads its header, so its pixel count and decoded size
+# are known before anything is decoded:
+# - more than max_pixels() is refused outright (decompression bomb guard)
+# - more than memory_limit() of decoded pixels is decoded in horizontal bands
+#   and resampled band by band when the file can be read a few rows at a time:
+#   plain rows (uncompressed TIFF, BMP, PPM/PGM), PNG (one zlib stream of
+#   filtered rows, read front to back) and stripped TIFF (LZW/deflate/PackBits
+#   strips are independent). Other formats (JPEG, WebP, interlaced or 16-bit
+#   colour PNG, ...) need the whole bitmap and are refused with a clear error
+#   instead of running the machine out of memory.
+
+DEFAULT_MAX_PIXELS = 1_000_000_000
+DEFAULT_MEMORY_LIMIT_MB = 1024
+
+# LANCZOS reads 3 source pixels on each side per unit of scale
+_LANCZOS_SUPPORT = 3
+
+# Bits per pixel of the raw layouts that can be cut into row bands
+_RAW_BITS = {
+    "1": 1, "L": 8, "P": 8, "LA": 16, "I;16": 16, "I;16B": 16, "I;16L": 16, "I;16N": 16,
+    "RGB": 24, "BGR": 24, "RGBA": 32, "RGBX": 32, "BGRA": 32, "BGRX": 32, "CMYK": 32, "I": 32, "F": 32,
+}
+
+
+# PNG: bytes per pixel -> colour type of an 8-bit PNG with pixels of that size
+# (filters work on whole pixels, so the raw rows decode as such an image)
+_PNG_CHANNELS = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}
+_PNG_BYTE_TYPES = {1: 0, 2: 4, 3: 2, 4: 6}
+_READ_SIZE = 1 << 20
+
+# TIFF: compressions whose strips can be decoded one by one, and the tags a
+# strip needs to decode on its own
+_TIFF_STRIP_CODECS = ("tiff_lzw", "tiff_adobe_deflate", "tiff_deflate", "packbits")
+_TIFF_STRIP_TAGS = (256, 258, 259, 262, 266, 277, 284, 317, 320, 338, 339)
+_STRIP_OFFSETS, _ROWS_PER_STRIP, _STRIP_BYTE_COUNTS, _PLANAR, _TILE_WIDTH = 273, 278, 279, 284, 322
+
+
+class ImageTooLarge(ValueError):
+    pass
+
+
+def max_pixels():
+    return int(os.environ.get("UC_MAX_PIXELS") or DEFAULT_MAX_PIXELS)
+
+def memory_limit(memory_mb=None):
+    # Bytes of decoded pixels one image may take: memory_mb (a job's own limit, in MB),
+    # else UC_MEMORY_LIMIT_MB, else the default
+    return int(float(memory_mb or os.environ.get("UC_MEMORY_LIMIT_MB") or DEFAULT_MEMORY_LIMIT_MB) * 1024 ** 2)
+
+
+def decoded_bytes(img):
+    # Pillow keeps 1, 2 or 4 bytes per pixel (RGB is stored as RGBX)
+    if img.mode in ("1", "L", "P"):
+        size = 1
+    elif img.mode.startswith("I;16"):
+        size = 2
+    else:
+        size = 4
+    return img.width * img.height * size
+
+
+def open_image(input_path):
+    # Image.open with the pixel-count guard. Pillow's own bomb check is set to
+    # the same limit (see load_pil), this turns it into one clear error.
+    from .engine import load_pil
+    Image = load_pil()
+    try:
+        img = Image.open(input_path)
+    except Image.DecompressionBombError:
+        raise ImageTooLarge(f"Image has more than {max_pixels() // 10 ** 6} megapixels (decompression bomb guard).")
+    if img.width * img.height > max_pixels():
+        raise ImageTooLarge(f"Image is {img.width}x{img.height} = {img.width * img.height // 10 ** 6} megapixels, "
+                            f"more than the {max_pixels() // 10 ** 6} megapixel limit.")
+    return img
+
+def check_memory(img, memory_mb=None):
+    # For paths that need the whole bitmap at once
+    needed = decoded_bytes(img)
+    if needed > memory_limit(memory_mb):
+        raise ImageTooLarge(f"Decoding this image needs {needed // 1024 ** 2} MB, more than the "
+                            f"{memory_limit(memory_mb) // 1024 ** 2} MB memory limit (--memory-limit or UC_MEMORY_LIMIT_MB).")
+
+
+# --- BANDED DECODING ---
+
+def _raw_layout(img):
+    # (offset, rawmode, stride, orientation) when the file is one block of plain rows, else None
+    if len(img.tile) != 1:
+        return None
+    tile = img.tile[0]
+    if tile[0] != "raw" or tuple(tile[1]) != (0, 0, img.width, img.height):
+        return None
+    args = tile[3] if isinstance(tile[3], tuple) else (tile[3],)
+    rawmode, stride, orientation = (tuple(args) + (0, 1))[:3]
+    if not stride:
+        bits = _RAW_BITS.get(rawmode)
+        if not bits:
+            return None
+        stride = (img.width * bits + 7) // 8
+    return tile[2], rawmode, stride, orientation or 1
+
+def _png_layout(img):
+    # (width, height, row bytes, bytes per pixel, rawmode) of a PNG that can be read row by row, else None
+    if img.format != "PNG" or not getattr(img, "filename", None):
+        return None
+    from .png import PNG_SIGNATURE  # png.py loads numpy: only imported for PNGs being banded
+    with open(img.filename, "rb") as f:
+        head = f.read(29)
+    if head[:8] != PNG_SIGNATURE or head[12:16] != b"IHDR":
+        return None
+    width, height, depth, color_type, _, _, interlace = struct.unpack(">IIBBBBB", head[16:29])
+    bits = depth * _PNG_CHANNELS.get(color_type, 0)
+    bpp = max(1, bits // 8)
+    # Adam7 passes are not rows; 16-bit colour has no 8-bit twin
+    if interlace or not bits or bpp not in _PNG_BYTE_TYPES:
+        return None
+    args = img.tile[0][3]
+    return width, height, (width * bits + 7) // 8, bpp, args if isinstance(args, str) else args[0]
+
+def _tiff_layout(img, memory_mb=None):
+    # (rows per strip, strip offsets, strip byte counts) of a stripped, compressed TIFF, else None
+    if img.format != "TIFF" or img.info.get("compression") not in _TIFF_STRIP_CODECS:
+        return None
+    tags = img.tag_v2
+    if _STRIP_OFFSETS not in tags or _TILE_WIDTH in tags or tags.get(_PLANAR, 1) != 1:
+        return None
+    rows = tags.get(_ROWS_PER_STRIP, img.height)
+    # A band holds at least one strip
+    if rows * decoded_bytes(img) / float(img.height) > memory_limit(memory_mb) / 8:
+        return None
+    return rows, list(tags[_STRIP_OFFSETS]), list(tags[_STRIP_BYTE_COUNTS])
+
+def can_band(img, memory_mb=None):
+    return _raw_layout(img) is not None or _png_layout(img) is not None or _tiff_layout(img, memory_mb) is not None
+
+def _band_reader(f, img, memory_mb=None):
+    # rows(y0, y1) -> image of rows y0..y1 read from the open file f. Bands are
+    # asked for top to bottom (they may overlap); PNG can only go forward.
+    layout = _raw_layout(img)
+    if layout is not None:
+        return lambda y0, y1: _load_rows(f, img.mode, layout, img.width, img.height, y0, y1)
+    layout = _png_layout(img)
+    if layout is not None:
+        return _png_reader(f, img.mode, layout)
+    return _tiff_reader(f, img, _tiff_layout(img, memory_mb))
+
+def _load_rows(f, mode, layout, width, height, y0, y1):
+    # Decodes rows y0..y1 only: reads just those bytes and runs Pillow's raw
+    # decoder on them (the format plugin is not involved past the header)
+    from PIL import Image
+    offset, rawmode, stride, orientation = layout
+    f.seek(offset + (y0 if orientation > 0 else height - y1) * stride)
+    data = f.read((y1 - y0) * stride)
+    return Image.frombytes(mode, (width, y1 - y0), data, "raw", rawmode, stride, orientation)
+
+def _idat(f):
+    # The compressed image data of a PNG, IDAT chunk by chunk, in pieces of at most _READ_SIZE
+    from .png import PNG_SIGNATURE
+    f.seek(len(PNG_SIGNATURE))
+    while True:
+        head = f.read(8)
+        if len(head) < 8:
+            return
+        length, tag = struct.unpack(">I4s", head)
+        if tag == b"IEND":
+            return
+        if tag != b"IDAT":
+            f.seek(length + 4, 1)
+            continue
+        while length:
+            piece = f.read(min(length, _READ_SIZE))
+            if not piece:
+                return
+            length -= len(piece)
+            yield piece
+        f.seek(4, 1)  # CRC
+
+def _unfilter(prev, filtered, count, row_bytes, bpp):
+    # Raw rows from `count` filtered ones. Pillow's PNG decoder does the work, on
+    # a small 8-bit PNG with the same bytes per pixel: the previous raw row (filter
+    # None, what Up/Average/Paeth predict from) followed by these rows.
+    from PIL import Image
+    from .png import PNG_SIGNATURE, chunk
+    header = struct.pack(">IIBBBBB", row_bytes // bpp, count + 1, 8, _PNG_BYTE_TYPES[bpp], 0, 0, 0)
+    data = b"".join([PNG_SIGNATURE, chunk(b"IHDR", header),
+                     chunk(b"IDAT", zlib.compress(b"\x00" + prev + filtered, 0)), chunk(b"IEND", b"")])
+    with Image.open(io.BytesIO(data)) as band:
+        return band.tobytes()[row_bytes:]
+
+def _png_reader(f, mode, layout):
+    from PIL import Image
+    width, height, row_bytes, bpp, rawmode = layout
+    stream = zlib.decompressobj()
+    pieces = _idat(f)
+    state = {"pending": b"", "prev": bytes(row_bytes), "start": 0, "kept": b""}
+
+    def filtered(count):
+        # The next `count` filtered rows (filter type byte + row bytes each)
+        need = count * (row_bytes + 1)
+        parts, have = [state["pending"]], len(state["pending"])
+        while have < need:
+            data = stream.unconsumed_tail or next(pieces, b"")
+            if not data:
+                raise ValueError("Corrupt PNG: the image data ends early.")
+            out = stream.decompress(data, need - have)
+            parts.append(out)
+            have += len(out)
+        data = b"".join(parts)
+        state["pending"] = data[need:]
+        return data[:need]
+
+    def rows(y0, y1):
+        # Rows already decoded for the previous band are kept for the overlap
+        done = state["start"] + len(state["kept"]) // row_bytes
+        data = state["kept"][(y0 - state["start"]) * row_bytes:]
+        if y1 > done:
+            new = _unfilter(state["prev"], filtered(y1 - done), y1 - done, row_bytes, bpp)
+            state["prev"] = new[-row_bytes:]
+            data += new
+        state["start"], state["kept"] = y0, data
+        return Image.frombytes(mode, (width, y1 - y0), data[:(y1 - y0) * row_bytes], "raw", rawmode)
+
+    return rows
+
+def _tiff_reader(f, img, layout):
+    # Decodes the strips a band covers, as a small TIFF of just those strips
+    from PIL import Image, TiffImagePlugin, TiffTags
+    rows_per_strip, offsets, counts = layout
+
+    def rows(y0, y1):
+        first, last = y0 // rows_per_strip, (y1 - 1) // rows_per_strip
+        strips = []
+        for i in range(first, last + 1):
+            f.seek(offsets[i])
+            strips.append(f.read(counts[i]))
+        top = first * rows_per_strip
+        ifd = TiffImagePlugin.ImageFileDirectory_v2(prefix=b"II")
+        for tag in _TIFF_STRIP_TAGS:
+            if tag in img.tag_v2:
+                ifd[tag] = img.tag_v2[tag]
+                ifd.tagtype[tag] = img.tag_v2.tagtype[tag]
+        ifd[257] = min(img.height, (last + 1) * rows_per_strip) - top
+        ifd[_ROWS_PER_STRIP] = rows_per_strip
+        ifd[_STRIP_BYTE_COUNTS] = [len(strip) for strip in strips]
+        # Pillow writes strip offsets relative to the end of the directory, where the strips follow
+        ifd[_STRIP_OFFSETS] = [sum(len(strip) for strip in strips[:i]) for i in range(len(strips))]
+        for tag in (_ROWS_PER_STRIP, _STRIP_BYTE_COUNTS, _STRIP_OFFSETS):
+            ifd.tagtype[tag] = TiffTags.LONG
+        data = b"II*\x00" + struct.pack("<I", 8) + ifd.tobytes(8) + b"".join(strips)
+        with Image.open(io.BytesIO(data)) as band:
+            return band.crop((0, y0 - top, img.width, y1 - top))
+
+    return rows
+
+def open_banded(input_path, target, cancel=None, memory_mb=None):
+    # Resamples the image to `target` (w, h) one band of rows at a time. Each band
+    # is decoded with enough extra rows above/below for the LANCZOS kernel and
+    # resized with a source box, so the result matches a whole-image resize
+    # without the seams. Peak memory stays below memory_limit(): one band, raw
+    # bytes + decoded, and for PNG/TIFF the compressed and unfiltered copies too.
+    from PIL import Image
+    from .jobs import check_cancel
+
+    img = open_image(input_path)
+    if not can_band(img, memory_mb):
+        raise ImageTooLarge("This image format cannot be processed in bands.")
+    width, height = img.size
+    scale_y = height / float(target[1])
+    margin = int(math.ceil(_LANCZOS_SUPPORT * max(scale_y, 1.0))) + 1
+    row_bytes = decoded_bytes(img) / float(height)
+    copies = 4 if _raw_layout(img) is not None else 12
+    band_rows = max(1, int(memory_limit(memory_mb) / copies / row_bytes))
+    # Output rows per band, leaving room for the margins
+    step = max(1, int((band_rows - 2 * margin) / scale_y))
+
+    out = None
+    with open(input_path, "rb") as f:
+        rows = _band_reader(f, img, memory_mb)
+        for oy0 in range(0, target[1], step):
+            check_cancel(cancel)
+            oy1 = min(target[1], oy0 + step)
+            sy0, sy1 = oy0 * scale_y, oy1 * scale_y
+            y0 = max(0, int(sy0) - margin)
+            y1 = min(height, int(math.ceil(sy1)) + margin)
+            band = _resamplable(rows(y0, y1), img)
+            part = band.resize((target[0], oy1 - oy0), Image.Resampling.LANCZOS, box=(0, sy0 - y0, width, sy1 - y0))
+            if out is None:
+                out = Image.new(part.mode, target)
+            out.paste(part, (0, oy0))
+            del band, part
+    return out
+
+def _resamplable(band, img):
+    # Palette and 1-bit bands are resampled as colour / grey (Pillow would fall back to NEAREST)
+    if band.mode == "P":
+        band.putpalette(img.palette)
+        if "transparency" in img.info:
+            band.info["transparency"] = img.info["transparency"]
+            return band.convert("RGBA")
+        return band.convert("RGB")
+    if band.mode == "1":
+        return band.convert("L")
+    return band
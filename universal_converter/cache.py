@@ -0,0 +1,249 @@
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+import threading
+
+# Content-addressed result cache.
+# Key = hash(input bytes) + operation parameters, value = the finished output file.
+# A repeat job becomes a copy (or hardlink) of the stored file.
+# The job's details (quality, ssim, encodes, ...) sit next to it in <entry>.json.
+
+# Bump when the compression/conversion logic changes so old results are not reused
+CACHE_VERSION = 4
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+_CHUNK = 1024 * 1024
+_DETAILS_SUFFIX = ".details.json"
+# Once over the limit, evict down to this share of it so the next walk is many stores away
+EVICT_TO = 0.9
+
+
+def default_cache_dir():
+    if os.environ.get("UC_CACHE_DIR"):
+        return os.environ["UC_CACHE_DIR"]
+    base = os.environ.get("LOCALAPPDATA") or os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(base, "universal_converter")
+
+
+def hash_file(path):
+    h = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class ResultCache:
+    # One instance may be shared by several threads (the GUI runs jobs side by side);
+    # _lock guards the counters and the running size
+    def __init__(self, root=None, max_bytes=DEFAULT_MAX_BYTES, link=False):
+        self.root = root or default_cache_dir()
+        self.max_bytes = max_bytes
+        self.link = link  # hardlink hits into place instead of copying
+        self.counters = {"hits": 0, "misses": 0, "bytes_saved": 0}
+        self._size = None  # bytes under objects/, walked once then kept up to date
+        self._stored = 0  # bytes this copy added, reported back by worker processes
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        # Copies sent to worker processes start counting from zero, but inherit the
+        # running size so they do not walk the cache again
+        with self._lock:
+            if self._size is None:
+                self._size = self._disk_size()
+            state = dict(self.__dict__)
+        state["counters"] = {"hits": 0, "misses": 0, "bytes_saved": 0}
+        state["_stored"] = 0
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    # --- KEYS & LOOKUP ---
+    def key(self, input_path, *params):
+        # params: operation name, target format / level, max_width, quality, ...
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(hash_file(input_path).encode())
+        digest.update(repr((CACHE_VERSION,) + params).encode())
+        return digest.hexdigest()
+
+    def _entry(self, key, output_path):
+        ext = os.path.splitext(output_path)[1].lower()
+        return os.path.join(self.root, "objects", key[:2], key + ext)
+
+    def _details_path(self, key):
+        return os.path.join(self.root, "objects", key[:2], key + _DETAILS_SUFFIX)
+
+    def fetch(self, key, output_path):
+        # Puts the cached result at output_path. Returns False on a miss.
+        entry = self._entry(key, output_path)
+        try:
+            size = os.path.getsize(entry)
+            place_file(entry, output_path, self.link)
+            os.utime(entry)  # mtime doubles as the LRU timestamp
+        except OSError:
+            # Not cached, or evicted by another process while being copied
+            with self._lock:
+                self.counters["misses"] += 1
+            return False
+        with self._lock:
+            self.counters["hits"] += 1
+            self.counters["bytes_saved"] += size
+        return True
+
+    def details(self, key):
+        # Details stored with the entry ({} when there are none)
+        try:
+            with open(self._details_path(key)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def store(self, key, output_path, details=None):
+        entry = self._entry(key, output_path)
+        os.makedirs(os.path.dirname(entry), exist_ok=True)
+        if details:
+            _write_json(self._details_path(key), details)
+        replaced = os.path.getsize(entry) if os.path.isfile(entry) else 0
+        place_file(output_path, entry, self.link)
+        size = os.path.getsize(entry) - replaced
+        with self._lock:
+            self._stored += size
+        self._grow(size)
+
+    # --- EVICTION ---
+    def _grow(self, size):
+        # Adds to the running size; the cache is only walked again once it is over the limit
+        with self._lock:
+            if self._size is None:
+                self._size = self._disk_size()
+            else:
+                self._size += size
+            over = self._size > self.max_bytes
+        if over:
+            self.evict(int(self.max_bytes * EVICT_TO))
+
+    def _disk_size(self):
+        return sum(size for _, size, _ in self._entries())
+
+    def _entries(self):
+        objects = os.path.join(self.root, "objects")
+        for dirpath, _, filenames in os.walk(objects):
+            for name in filenames:
+                if name.startswith(".tmp-") or name.endswith(_DETAILS_SUFFIX):
+                    continue
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                yield st.st_mtime, st.st_size, path
+
+    def evict(self, max_bytes=None):
+        # Least recently used entries go first until the cache fits
+        limit = self.max_bytes if max_bytes is None else max_bytes
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= limit:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                continue
+            details = os.path.splitext(path)[0] + _DETAILS_SUFFIX
+            if os.path.exists(details):
+                os.remove(details)
+        with self._lock:
+            self._size = total
+        return total
+
+    def clear(self):
+        shutil.rmtree(os.path.join(self.root, "objects"), ignore_errors=True)
+        with self._lock:
+            self._size = 0
+
+    # --- STATS ---
+    def report(self):
+        # What a worker process sends back to merge(): its counters and the bytes it stored
+        with self._lock:
+            return dict(self.counters, stored_bytes=self._stored)
+
+    def merge(self, report):
+        # Adds a report() from a worker process
+        report = dict(report)
+        self._grow(report.pop("stored_bytes", 0))
+        with self._lock:
+            for name, value in report.items():
+                self.counters[name] += value
+
+    def _stats_path(self):
+        return os.path.join(self.root, "stats.json")
+
+    def _load_totals(self):
+        try:
+            with open(self._stats_path()) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {"hits": 0, "misses": 0, "bytes_saved": 0}
+
+    def save_stats(self):
+        # Folds this session's counters into the persistent totals. Held under the
+        # lock so two threads never both read the same totals or counters.
+        with self._lock:
+            totals = self._load_totals()
+            for name, value in self.counters.items():
+                totals[name] = totals.get(name, 0) + value
+            self.counters = {"hits": 0, "misses": 0, "bytes_saved": 0}
+            os.makedirs(self.root, exist_ok=True)
+            _write_json(self._stats_path(), totals)
+
+    def stats(self):
+        with self._lock:
+            totals = self._load_totals()
+            for name, value in self.counters.items():
+                totals[name] = totals.get(name, 0) + value
+        entries = list(self._entries())
+        totals["entries"] = len(entries)
+        totals["size_bytes"] = sum(size for _, size, _ in entries)
+        totals["max_bytes"] = self.max_bytes
+        return totals
+
+
+def _write_json(path, data):
+    # Temp name + rename, like place_file
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", dir=os.path.dirname(path))
+    with os.fdopen(fd, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def place_file(src, dst, link=False):
+    # Writes dst via a temp name + rename so concurrent workers never see a partial file.
+    # Returns True when dst became a hardlink of src, False when it was copied.
+    folder = os.path.dirname(os.path.abspath(dst))
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", suffix=os.path.splitext(dst)[1], dir=folder)
+    os.close(fd)
+    linked = False
+    try:
+        if link:
+            os.remove(tmp_path)
+            try:
+                os.link(src, tmp_path)
+                linked = True
+            except OSError:
+                # Different filesystem / no hardlink support
+                shutil.copyfile(src, tmp_path)
+                shutil.copymode(src, tmp_path)
+        else:
+            shutil.copyfile(src, tmp_path)
+            shutil.copymode(src, tmp_path)
+        os.replace(tmp_path, dst)
+        return linked
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
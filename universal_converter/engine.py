@@ -0,0 +1,1074 @@
+import io
+import os
+import re
+import glob
+import json
+import shutil
+import time
+import struct
+from contextlib import contextmanager
+
+from .media import convert_video, extract_audio, compress_video, probe, grab_frame
+from .jobs import Cancelled, check_cancel, report
+from .bands import open_image, check_memory, decoded_bytes, memory_limit, can_band, open_banded, max_pixels
+
+# --- 1. CONFIGURATION ---
+# Pillow, pillow_heif and pypdf are imported on first use (see load_pil and
+# compress_logic), so importing the engine - and starting the GUI - stays fast.
+
+IMAGE_EXTS = ['.png', '.jpg', '.jpeg', '.webp', '.avif', '.bmp', '.heic', '.tif', '.tiff', '.ppm', '.pgm']
+# Compressed without a quality setting (no quality search for these)
+LOSSLESS_EXTS = ['.png', '.bmp', '.tif', '.tiff', '.ppm', '.pgm']
+# "low" on these is lossless: metadata is stripped without decoding (see jpeg.py)
+JPEG_EXTS = ['.jpg', '.jpeg']
+# Lossy formats that keep transparency
+ALPHA_EXTS = ['.webp', '.avif']
+VIDEO_EXTS = ['.mp4', '.mkv', '.avi', '.mov', '.flv']
+COMPRESS_EXTS = IMAGE_EXTS + ['.pdf'] + VIDEO_EXTS
+
+# reduce() may shrink down to this multiple of the target size before the final
+# LANCZOS pass (same default Pillow's thumbnail() uses), so quality stays close
+# to a full-resolution resize.
+REDUCING_GAP = 2.0
+
+# Compression levels: (max_width, jpeg quality)
+# The GUI shows long labels ("High Compression (Low Quality)"), the CLI uses the short keys.
+LEVELS = {
+    "low": (2560, 85),
+    "medium": (1920, 65),
+    "high": (1280, 30),
+    "extreme": (1024, 15),
+    # Quality picked per image (see fit_to_ssim); 85 is the ceiling and the PDF setting
+    "visual": (2560, 85),
+}
+
+
+# Target-size mode (compress_logic(..., target_bytes=...)): quality search range
+# and the most trial encodes one image may cost
+TARGET_QUALITY = (10, 95)
+TARGET_MAX_ENCODES = 14
+# When the image has to shrink, the width is searched to within this fraction
+TARGET_WIDTH_TOLERANCE = 0.02
+
+# "Visually lossless" level: lowest quality whose SSIM against the resized
+# source (luminance, see metrics.py) stays at or above this
+VISUAL_SSIM = 0.99
+VISUAL_MIN_QUALITY = 20
+
+# Videos: (x264 CRF, audio bitrate) per level; the max width is the image
+# table's (LEVELS), so a level shrinks videos and images alike. CRF 18 is the
+# usual "visually lossless" point for x264.
+VIDEO_LEVELS = {
+    "low": (20, "192k"),
+    "medium": (24, "128k"),
+    "high": (28, "96k"),
+    "extreme": (32, "64k"),
+    "visual": (18, "192k"),
+}
+
+# Contact sheets (video_sheet): frames, columns, pixels between tiles, background
+SHEET_FRAMES = 12
+SHEET_COLUMNS = 4
+SHEET_GAP = 4
+SHEET_BACKGROUND = (16, 16, 16)
+
+# Embedded images in PDFs are downsampled to this resolution (same quality table as images)
+PDF_IMAGE_DPI = {
+    "low": 300,
+    "medium": 150,
+    "high": 110,
+    "extreme": 72,
+    "visual": 300,
+}
+
+
+# WebP/AVIF encoder effort, chosen per job: "fast" for bulk runs, "best" for the
+# smallest files. "balanced" is each library's own default. Lossless WebP uses
+# quality as its effort setting. See benchmarks/bench_encoders.py.
+EFFORTS = {
+    "fast": {"webp": {"method": 1}, "webp_lossless": {"method": 0, "quality": 0}, "avif": {"speed": 9}},
+    "balanced": {"webp": {"method": 4}, "webp_lossless": {"method": 4, "quality": 50}, "avif": {"speed": 6}},
+    "best": {"webp": {"method": 6}, "webp_lossless": {"method": 5, "quality": 80}, "avif": {"speed": 4}},
+}
+DEFAULT_EFFORT = "balanced"
+
+
+_heif_registered = False
+
+def load_pil():
+    # Returns PIL.Image, registering the HEIC opener the first time
+    global _heif_registered
+    from PIL import Image
+    if not _heif_registered:
+        import pillow_heif
+        pillow_heif.register_heif_opener()
+        # Pillow's decompression bomb check follows our own limit (see bands.py)
+        Image.MAX_IMAGE_PIXELS = max_pixels()
+        _heif_registered = True
+    return Image
+
+
+def level_key(compression_level):
+    # Accepts "extreme", "Extreme Compression", "High Compression (Low Quality)", ...
+    name = (compression_level or "medium").strip().lower()
+    for key in LEVELS:
+        if name.startswith(key):
+            return key
+    return "medium"
+
+
+def effort_key(effort):
+    # Accepts "fast", "Best (Slower)", None, ...
+    name = (effort or DEFAULT_EFFORT).strip().lower()
+    for key in EFFORTS:
+        if name.startswith(key):
+            return key
+    return DEFAULT_EFFORT
+
+def encoder_options(fmt, effort=None, lossless=False):
+    # Extra Image.save() arguments for WebP/AVIF at an effort tier ({} for other formats)
+    fmt = fmt.lower().lstrip(".")
+    if fmt == "webp" and lossless:
+        return dict(EFFORTS[effort_key(effort)]["webp_lossless"], lossless=True)
+    return dict(EFFORTS[effort_key(effort)].get(fmt, {}))
+
+def effort_tag(fmt, effort=None):
+    # Cache key part: only WebP/AVIF outputs depend on the effort
+    return [effort_key(effort)] if fmt.lower().lstrip(".") in ("webp", "avif") else []
+
+def save_mode(fmt, img):
+    # Mode img has to be in for fmt: JPEG has no alpha, WebP/AVIF take RGB or RGBA
+    fmt = fmt.lower().lstrip(".")
+    if fmt in ("jpg", "jpeg"):
+        return "RGB"
+    if fmt in ("webp", "avif") and img.mode not in ("RGB", "RGBA"):
+        return "RGBA" if img.has_transparency_data else "RGB"
+    return img.mode
+
+def webp_is_lossless(input_path):
+    # True for a VP8L (lossless) WebP; only the RIFF chunk headers are read
+    with open(input_path, "rb") as f:
+        header = f.read(12)
+        if header[:4] != b"RIFF" or header[8:12] != b"WEBP":
+            return False
+        while True:
+            chunk = f.read(8)
+            if len(chunk) < 8:
+                return False
+            tag, size = chunk[:4], struct.unpack("<I", chunk[4:])[0]
+            if tag in (b"VP8L", b"VP8 "):
+                return tag == b"VP8L"
+            f.seek(size + (size & 1), 1)
+
+
+@contextmanager
+def atomic_output(output_path):
+    # Yields a temp path next to output_path; it only replaces output_path once the
+    # write finished and produced a non-empty file, so readers never see half a file.
+    folder = os.path.dirname(os.path.abspath(output_path))
+    suffix = os.path.splitext(output_path)[1]
+    while True:
+        # Created 0666 like a normal file, so the kernel applies the umask (mkstemp would give 0600)
+        tmp_path = os.path.join(folder, f".tmp-{os.urandom(6).hex()}{suffix}")
+        try:
+            os.close(os.open(tmp_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o666))
+            break
+        except FileExistsError:
+            continue
+    mode = os.stat(tmp_path).st_mode & 0o777
+    try:
+        yield tmp_path
+        if os.path.getsize(tmp_path) == 0:
+            raise IOError("Output file is empty")
+        os.chmod(tmp_path, mode)  # in case the writer replaced the temp file instead of filling it
+        os.replace(tmp_path, output_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def job_result(input_path, output_path=None, error=None, started=None, cached=False):
+    # Structured result for one job, filled in from the single compression pass
+    input_bytes = os.path.getsize(input_path) if os.path.isfile(input_path) else 0
+    output_bytes = os.path.getsize(output_path) if output_path and not error else 0
+    return {
+        "ok": error is None,
+        "input": input_path,
+        "output": None if error else output_path,
+        "error": error,
+        "input_bytes": input_bytes,
+        "output_bytes": output_bytes,
+        "elapsed": time.perf_counter() - started if started else 0.0,
+        "ratio": (output_bytes / input_bytes) if input_bytes and not error else None,
+        "cached": cached,
+    }
+
+def format_bytes(num):
+    for unit in ("B", "KB", "MB", "GB"):
+        if num < 1024 or unit == "GB":
+            return f"{num:.0f} {unit}" if unit == "B" else f"{num:.1f} {unit}"
+        num /= 1024.0
+
+def result_error(result):
+    # Error message of a job result (dict or legacy string), or None on success
+    if isinstance(result, dict):
+        return result["error"]
+    return result if "Error" in result else None
+
+
+# --- 2. LOGIC: CONVERTER ---
+# progress(fraction, detail) and cancel (a threading.Event) are optional on every
+# logic function; the job scheduler (jobs.py) passes them in. A cancelled job
+# raises Cancelled instead of returning an error string.
+
+# convert_image routes that serve a source already in the target format without decoding
+SAME_FORMAT_ROUTES = ("copy", "hardlink", "rewrite")
+
+def same_format_route(source_format, output_format):
+    # How a source already in (or trivially compatible with) the target format is
+    # served without decoding: "copy", "rewrite" (container only) or None.
+    # source_format is what Pillow read from the file header, not the extension.
+    target = {"jpg": "JPEG", "jpeg": "JPEG"}.get(output_format.lower(), output_format.upper())
+    if source_format == target:
+        return "copy"
+    if source_format == "MPO" and target == "JPEG":
+        return "rewrite"
+    return None
+
+def convert_image(input_path, output_path, output_format, progress=None, cancel=None, effort=None, link=False,
+                  memory_mb=None):
+    # effort: WebP/AVIF encoder tier (see EFFORTS). memory_mb: decoded-pixel limit (see bands.memory_limit).
+    # A source that already is the target format is copied (hardlinked with
+    # link=True), a multi-picture JPEG only loses its extra images; only a real
+    # format change decodes. The result's "route" says which of
+    # "copy" / "hardlink" / "rewrite" / "decode" was taken.
+    started = time.perf_counter()
+    try:
+        check_cancel(cancel)
+        img = open_image(input_path)
+        route = same_format_route(img.format, output_format)
+        if route == "copy":
+            from .cache import place_file
+            img.close()
+            route = "hardlink" if place_file(input_path, output_path, link) else "copy"
+        elif route == "rewrite":
+            from .jpeg import primary_image
+            img.close()
+            with open(input_path, "rb") as f:
+                data = primary_image(f.read())
+            with atomic_output(output_path) as tmp_path:
+                with open(tmp_path, "wb") as f:
+                    f.write(data)
+        else:
+            route = "decode"
+            # Same size out as in: the whole bitmap has to fit in memory
+            check_memory(img, memory_mb)
+            mode = save_mode(output_format, img)
+            if img.mode != mode:
+                img = img.convert(mode)
+            check_cancel(cancel)
+            img.save(output_path, quality=95, **encoder_options(output_format, effort))
+        result = job_result(input_path, output_path, started=started)
+        result["route"] = route
+        return result
+    except Cancelled:
+        raise
+    except Exception as e:
+        return job_result(input_path, error=f"Error: {str(e)}", started=started)
+
+def convert_media(input_path, output_path, output_format, progress=None, cancel=None, cores=None):
+    # ffmpeg directly: stream copy when the codecs fit the target, else re-encode
+    # cores: how many cores this job may use (long videos are encoded in that many chunks at once)
+    # The result's "route" is "remux" / "transcode" / "segmented" (video) or "demux" / "encode" (audio).
+    started = time.perf_counter()
+    try:
+        with atomic_output(output_path) as tmp_path:
+            if output_format.lower() in ['mp3', 'wav']:
+                route = extract_audio(input_path, tmp_path, output_format, progress=progress, cancel=cancel)
+                route = "demux" if route == "copy" else route
+            else:
+                route = convert_video(input_path, tmp_path, output_format, progress=progress, cancel=cancel,
+                                      workers=cores)
+        result = job_result(input_path, output_path, started=started)
+        result["route"] = route
+        return result
+    except Cancelled:
+        raise
+    except Exception as e:
+        return job_result(input_path, error=f"Error: {str(e)}", started=started)
+
+def process_conversion(input_path, output_path, target_format, cache=None, progress=None, cancel=None,
+                       effort=None, link=False, cores=None, memory_mb=None):
+    # Routes a file to the right converter based on its extension.
+    # link: same-format image conversions may hardlink the source (the cache's setting when cached)
+    # cores: cores this job may use (see convert_media); default every core
+    # memory_mb: decoded-pixel limit for images (see bands.memory_limit)
+    # Always returns a job_result; a cache hit has route "cache".
+    started = time.perf_counter()
+    ext = os.path.splitext(input_path)[1].lower()
+    if cache and (ext in IMAGE_EXTS or ext in VIDEO_EXTS):
+        try:
+            key = cache.key(input_path, "convert", target_format.lower(), 95, *effort_tag(target_format, effort))
+            if cache.fetch(key, output_path):
+                result = job_result(input_path, output_path, started=started, cached=True)
+                result["route"] = "cache"
+                return result
+        except OSError as e:
+            return job_result(input_path, error=f"Error: {str(e)}", started=started)
+        result = process_conversion(input_path, output_path, target_format, progress=progress, cancel=cancel,
+                                    effort=effort, link=cache.link, cores=cores, memory_mb=memory_mb)
+        # A same-format copy is as cheap as a cache hit; it would only take up cache space
+        if not result_error(result) and result["route"] not in SAME_FORMAT_ROUTES:
+            cache.store(key, output_path)
+        return result
+
+    if ext in IMAGE_EXTS:
+        if target_format in ['mp3', 'wav', 'mp4', 'mkv']:
+            return job_result(input_path, error="Error: Cannot convert Image to Audio/Video.")
+        return convert_image(input_path, output_path, target_format, progress, cancel, effort, link, memory_mb)
+    elif ext in VIDEO_EXTS:
+        return convert_media(input_path, output_path, target_format, progress, cancel, cores)
+    return job_result(input_path, error="Error: Unsupported file type.")
+
+
+# --- 2.5 LOGIC: ONE IMAGE, SEVERAL OUTPUTS ---
+
+def image_targets(base_path, formats, widths=None):
+    # (output_path, format, max_width) for every format and ladder width.
+    # base_path only gives the folder and file stem; ladder variants are named
+    # photo_1280.webp, width None keeps the full size (photo.webp).
+    stem = os.path.splitext(base_path)[0]
+    return [(f"{stem}_{width}.{fmt}" if width else f"{stem}.{fmt}", fmt.lower(), width)
+            for width in (widths or [None]) for fmt in formats]
+
+def convert_image_targets(input_path, targets, cache=None, workers=None, progress=None, cancel=None,
+                          effort=None, memory_mb=None):
+    # targets: (output_path, format, max_width or None) tuples, see image_targets().
+    # The source is decoded once, each (width, mode) variant is derived once and
+    # the encodes run in parallel threads (Pillow's encoders release the GIL).
+    # Returns [(output_path, result)] in target order; result is the output path
+    # or "Error: ...". A full-size target in the source's own format is copied or
+    # rewritten like in convert_image; only the other targets decode.
+    results = {}
+    keys = {}
+    todo = []
+    source_format = None
+    if any(width is None for _, _, width in targets):
+        try:
+            with open_image(input_path) as img:
+                source_format = img.format
+        except Exception:
+            pass  # reported by the decode below
+    for output_path, fmt, width in targets:
+        if width is None and same_format_route(source_format, fmt):
+            result = convert_image(input_path, output_path, fmt, cancel=cancel, link=bool(cache and cache.link),
+                                   memory_mb=memory_mb)
+            results[output_path] = result["error"] or output_path
+            continue
+        try:
+            if cache:
+                # Full-size outputs share cache entries with process_conversion
+                keys[output_path] = cache.key(input_path, "convert", fmt, 95, *effort_tag(fmt, effort),
+                                              *([width] if width else []))
+                if cache.fetch(keys[output_path], output_path):
+                    results[output_path] = output_path
+                    continue
+        except OSError as e:
+            results[output_path] = f"Error: {str(e)}"
+            continue
+        todo.append((output_path, fmt, width))
+
+    if todo:
+        try:
+            check_cancel(cancel)
+            variants = _image_variants(input_path, todo, memory_mb)
+        except Cancelled:
+            raise
+        except Exception as e:
+            variants = None
+            results.update((output_path, f"Error: {str(e)}") for output_path, _, _ in todo)
+
+        if variants:
+            from concurrent.futures import ThreadPoolExecutor
+            with ThreadPoolExecutor(max_workers=workers or min(len(todo), os.cpu_count() or 1)) as pool:
+                futures = [(output_path, pool.submit(_encode_image, img, output_path, effort))
+                           for (output_path, _, _), img in zip(todo, variants)]
+                for done, (output_path, future) in enumerate(futures, 1):
+                    if cancel is not None and cancel.is_set():
+                        pool.shutdown(wait=True, cancel_futures=True)
+                        raise Cancelled("Cancelled")
+                    results[output_path] = future.result()
+                    if cache and not result_error(results[output_path]):
+                        cache.store(keys[output_path], output_path)
+                    report(progress, done, len(futures), os.path.basename(output_path))
+    return [(output_path, results[output_path]) for output_path, _, _ in targets]
+
+def _image_variants(input_path, targets, memory_mb=None):
+    # One image per target. Each size is resized once, each (size, mode) converted
+    # once; targets sharing a variant get their own copy, because Image.save()
+    # keeps per-call state on the image object.
+    widths = {width for _, _, width in targets}
+    if None in widths:
+        base = open_image(input_path)
+        check_memory(base, memory_mb)
+    else:
+        # Decode straight at the largest size needed (JPEG draft, reduce)
+        base = open_downscaled(input_path, max(widths), memory_mb=memory_mb)
+    base.load()
+
+    sized = cascade_resize(base, [w for w in widths if w])
+    sized[None] = base
+
+    converted = {}
+    variants = []
+    for _, fmt, width in targets:
+        mode = save_mode(fmt, sized[width])
+        key = (width, mode)
+        if key not in converted:
+            img = sized[width]
+            converted[key] = img.convert(mode) if img.mode != mode else img
+            variants.append(converted[key])
+        else:
+            variants.append(converted[key].copy())
+    return variants
+
+def _encode_image(img, output_path, effort=None):
+    try:
+        with atomic_output(output_path) as tmp_path:
+            img.save(tmp_path, quality=95, **encoder_options(os.path.splitext(output_path)[1], effort))
+        return output_path
+    except Exception as e:
+        return f"Error: {str(e)}"
+
+
+# --- 2.6 LOGIC: VIDEO THUMBNAILS ---
+
+def sheet_times(duration, count):
+    # Evenly spread timestamps, each in the middle of its slice (never 0 or the very end)
+    return [duration * (i + 0.5) / count for i in range(count)]
+
+def video_frames(input_path, times, workers=None, progress=None, cancel=None):
+    # [(seconds, image)] for each timestamp that has a frame. Every frame is one
+    # keyframe seek + one decode (see media.grab_frame), run in parallel ffmpeg
+    # processes, so the cost grows with the number of frames, not the video length.
+    # Timestamps that land on an already used keyframe (long GOPs, short videos)
+    # are grabbed again with an accurate seek, which decodes at most one GOP.
+    from concurrent.futures import ThreadPoolExecutor
+    Image = load_pil()
+    grabbed = {}
+    with ThreadPoolExecutor(max_workers=workers or min(len(times), os.cpu_count() or 1)) as pool:
+        for accurate in (False, True):
+            todo = times if not accurate else [t for t in times if _repeated(grabbed, t)]
+            futures = [(t, pool.submit(grab_frame, input_path, t, cancel, accurate)) for t in todo]
+            for done, (t, future) in enumerate(futures, 1):
+                if cancel is not None and cancel.is_set():
+                    pool.shutdown(wait=True, cancel_futures=True)
+                    raise Cancelled("Cancelled")
+                data, shown_at = future.result()
+                grabbed[t] = (data, t if shown_at is None else shown_at)
+                if not accurate:
+                    report(progress, done, len(futures), f"frame {done}/{len(futures)}")
+    # Labelled with the frame's own time (a keyframe may be up to one GOP before t)
+    return [(shown_at, Image.open(io.BytesIO(data))) for data, shown_at in (grabbed[t] for t in times) if data]
+
+def _repeated(grabbed, t):
+    # t got the same frame as an earlier timestamp
+    data, shown_at = grabbed[t]
+    return bool(data) and any(s == shown_at for other, (d, s) in grabbed.items() if other < t and d)
+
+def video_sheet(input_path, output_path, count=SHEET_FRAMES, columns=SHEET_COLUMNS, compression_level="medium",
+                effort=None, progress=None, cancel=None):
+    # Poster frame (count=1) or contact sheet: `count` frames spread over the video,
+    # in a grid `columns` wide and at most as wide as the level's max_width, each tile
+    # labelled with its timestamp. Tiles go through cascade_resize and the sheet
+    # through save_compressed, like any other image (the format follows output_path).
+    started = time.perf_counter()
+    ext = os.path.splitext(output_path)[1].lower()
+    if ext not in ('.jpg', '.jpeg', '.png', '.webp', '.avif'):
+        return job_result(input_path, error="Error: Thumbnails are saved as jpg, png, webp or avif.")
+    level = level_key(compression_level)
+    max_width, qual = LEVELS[level]
+    try:
+        duration = probe(input_path)["duration"]
+        if not duration:
+            raise ValueError("The video's duration could not be read.")
+        frames = video_frames(input_path, sheet_times(duration, count), progress=progress, cancel=cancel)
+        if not frames:
+            raise ValueError("No frames could be read from this video.")
+        check_cancel(cancel)
+        if count == 1:
+            sheet = cascade_resize(frames[0][1], [max_width])[max_width]
+        else:
+            sheet = _tile(frames, min(columns, len(frames)), max_width)
+        with atomic_output(output_path) as tmp_path:
+            save_compressed(sheet, tmp_path, ext, level, qual, effort)
+        result = job_result(input_path, output_path, started=started)
+        result["frames"] = [round(t, 2) for t, _ in frames]
+        return result
+    except Cancelled:
+        raise
+    except Exception as e:
+        return job_result(input_path, error=f"Error: {str(e)}", started=started)
+
+def _tile(frames, columns, width):
+    from PIL import ImageDraw, ImageFont
+    Image = load_pil()
+    # cascade_resize never enlarges: small videos give a narrower sheet, not empty cells
+    tile_w = min(max(16, (width - SHEET_GAP * (columns + 1)) // columns), min(img.width for _, img in frames))
+    tiles = [(t, cascade_resize(img, [tile_w])[tile_w]) for t, img in frames]
+    tile_h = max(img.height for _, img in tiles)
+    rows = -(-len(tiles) // columns)
+    sheet = Image.new("RGB", (SHEET_GAP + columns * (tile_w + SHEET_GAP), SHEET_GAP + rows * (tile_h + SHEET_GAP)),
+                      SHEET_BACKGROUND)
+    draw = ImageDraw.Draw(sheet)
+    font = ImageFont.load_default(size=max(10, tile_h // 12))
+    for i, (t, img) in enumerate(tiles):
+        x = SHEET_GAP + (i % columns) * (tile_w + SHEET_GAP)
+        y = SHEET_GAP + (i // columns) * (tile_h + SHEET_GAP)
+        sheet.paste(img.convert("RGB"), (x, y))
+        label = f"{int(t) // 3600}:{int(t) // 60 % 60:02d}:{int(t) % 60:02d}"
+        box = draw.textbbox((x + 4, y + img.height - 4), label, font=font, anchor="lb")
+        draw.rectangle((box[0] - 2, box[1] - 2, box[2] + 2, box[3] + 2), fill=(0, 0, 0))
+        draw.text((x + 4, y + img.height - 4), label, font=font, fill=(255, 255, 255), anchor="lb")
+    return sheet
+
+
+# --- 3. LOGIC: COMPRESSOR ---
+
+def compress_logic(input_path, output_path, compression_level, cache=None, progress=None, cancel=None,
+                   target_bytes=None, effort=None, cores=None, dither=True, memory_mb=None):
+    # Single pass: decode, re-encode into a temp file, rename into place.
+    # With a ResultCache, a repeat of the same input + level is just a copy.
+    # target_bytes (images and videos): search quality/width for the best image under
+    # that size instead of using the level's fixed quality (see fit_to_size), or
+    # encode a video in two passes at the bitrate that fills it (see compress_video).
+    # effort: WebP/AVIF encoder tier (see EFFORTS).
+    # dither: Floyd-Steinberg dithering when Extreme reduces a PNG to 256 colours (see png.quantize).
+    # memory_mb: decoded-pixel limit for images, bigger ones are banded or refused (see bands.memory_limit).
+    # cores: cores this job may use for a video's chunks or a PDF's page ranges; default every core.
+    started = time.perf_counter()
+    ext = os.path.splitext(input_path)[1].lower()
+    if ext not in COMPRESS_EXTS:
+        return job_result(input_path, error="Error: Compression currently only supports Images, Videos and PDFs.")
+    if target_bytes and ext == '.pdf':
+        return job_result(input_path, error="Error: A target size is only supported for images and videos.")
+
+    level = level_key(compression_level)
+    try:
+        if cache:
+            extra = ([target_bytes] if target_bytes else []) + effort_tag(ext, effort)
+            if ext == '.png' and level == "extreme":
+                extra.append("dither" if dither else "no-dither")
+            if ext in JPEG_EXTS and level == "low" and not target_bytes:
+                extra.append("lossless")
+            if ext in VIDEO_EXTS:
+                extra += VIDEO_LEVELS[level]
+            key = cache.key(input_path, "compress", level, *LEVELS[level], ext, *extra)
+            if cache.fetch(key, output_path):
+                # Quality/ssim/encodes of the run that made the entry
+                result = job_result(input_path, output_path, started=started, cached=True)
+                result.update(cache.details(key))
+                return result
+
+        details = {}
+        with atomic_output(output_path) as tmp_path:
+            if ext in IMAGE_EXTS and target_bytes:
+                details = compress_image_to_size(input_path, tmp_path, level, target_bytes, progress, cancel, effort,
+                                                 dither, memory_mb)
+            elif ext in JPEG_EXTS and level == "low":
+                details = compress_jpeg_lossless(input_path, tmp_path, cancel, effort, memory_mb)
+            elif ext in IMAGE_EXTS and level == "visual":
+                details = compress_image_visual(input_path, tmp_path, progress, cancel, effort, memory_mb)
+            elif ext in IMAGE_EXTS:
+                details = compress_image(input_path, tmp_path, level, cancel, effort, dither, memory_mb)
+            elif ext in VIDEO_EXTS:
+                crf, audio_bitrate = VIDEO_LEVELS[level]
+                details = compress_video(input_path, tmp_path, crf, LEVELS[level][0], audio_bitrate, target_bytes,
+                                         workers=cores, progress=progress, cancel=cancel)
+            else:
+                from .pdf import compress_pdf
+                details = compress_pdf(input_path, tmp_path, quality=LEVELS[level][1], dpi=PDF_IMAGE_DPI[level],
+                                       workers=cores, progress=progress, cancel=cancel)
+        if cache:
+            cache.store(key, output_path, details)
+        result = job_result(input_path, output_path, started=started)
+        result.update(details)
+        return result
+    except Cancelled:
+        raise
+    except Exception as e:
+        return job_result(input_path, error=f"Error: {str(e)}", started=started)
+
+# --- A. IMAGE COMPRESSION ---
+def compress_image(input_path, output_path, level, cancel=None, effort=None, dither=True, memory_mb=None):
+    ext = os.path.splitext(input_path)[1].lower()
+    max_width, qual = LEVELS[level]
+    # A lossless WebP stays lossless at "low" (re-encoded at the effort tier)
+    lossless = ext == '.webp' and level == "low" and webp_is_lossless(input_path)
+
+    # 1. RESIZE IF NEEDED
+    # We only shrink, never enlarge
+    img = open_downscaled(input_path, max_width, cancel, memory_mb)
+    check_cancel(cancel)
+
+    # 2. SAVE
+    save_compressed(img, output_path, ext, level, qual, effort, lossless, dither)
+    if os.path.getsize(output_path) >= os.path.getsize(input_path):
+        # Already packed tighter than this level does (like compress_video): keep the original
+        shutil.copyfile(input_path, output_path)
+        return {"skipped": True}
+    return {"lossless": True} if lossless else {}
+
+def compress_jpeg_lossless(input_path, output_path, cancel=None, effort=None, memory_mb=None):
+    # "low" for JPEGs: metadata out, Huffman tables optimized, pixels untouched.
+    # No resize either; a file that is not really a JPEG takes the normal path.
+    from .jpeg import optimize_jpeg
+    check_cancel(cancel)
+    try:
+        return optimize_jpeg(input_path, output_path)
+    except ValueError:
+        return compress_image(input_path, output_path, "low", cancel, effort, memory_mb=memory_mb)
+
+def save_compressed(img, output_path, ext, level, qual, effort=None, lossless=False, dither=True):
+    if ext == '.png':
+        # Lossless colour-type reduction + filter/zlib search (see png.py).
+        # Converting to P mode (256 colors) saves massive space but loses some color depth.
+        # If "Extreme", we force color reduction.
+        from .png import encode_png, quantize
+        if level == "extreme":
+            img = quantize(img, dither=dither)
+        try:
+            data, _ = encode_png(img)
+        except ValueError:
+            # 16-bit, CMYK, ...: Pillow's own encoder
+            img.save(output_path, format="PNG", optimize=True)
+            return
+        if hasattr(output_path, "write"):
+            output_path.write(data)
+        else:
+            with open(output_path, "wb") as f:
+                f.write(data)
+    elif ext in ('.tif', '.tiff'):
+        # Scans stay lossless, deflate instead of uncompressed strips
+        img.save(output_path, format="TIFF", compression="tiff_adobe_deflate")
+    elif ext in ALPHA_EXTS:
+        # WebP/AVIF keep transparency; effort trades encode time for size
+        mode = save_mode(ext, img)
+        if img.mode != mode:
+            img = img.convert(mode)
+        options = {"quality": qual}
+        options.update(encoder_options(ext, effort, lossless))
+        img.save(output_path, format=_pil_format(ext), **options)
+    else:
+        # JPG
+        if img.mode in ("RGBA", "P"): img = img.convert("RGB")
+        img.save(output_path, format=_pil_format(ext), optimize=True, quality=qual)
+
+def _pil_format(ext):
+    # Pillow format name for an extension; needed when saving into a buffer
+    Image = load_pil()
+    return Image.registered_extensions().get(ext, "JPEG")
+
+def compress_image_visual(input_path, output_path, progress=None, cancel=None, effort=None, memory_mb=None):
+    # "Visually lossless": decode and resize once, then fit_to_ssim() picks the quality
+    ext = os.path.splitext(input_path)[1].lower()
+    img = open_downscaled(input_path, LEVELS["visual"][0], cancel, memory_mb)
+    img.load()
+    check_cancel(cancel)
+    if ext in LOSSLESS_EXTS:
+        # Lossless anyway
+        save_compressed(img, output_path, ext, "visual", None)
+        return {"quality": None, "ssim": 1.0}
+    data, details = fit_to_ssim(img, ext, progress=progress, cancel=cancel, effort=effort)
+    with open(output_path, "wb") as f:
+        f.write(data)
+    return details
+
+def fit_to_ssim(img, ext, threshold=VISUAL_SSIM, progress=None, cancel=None, effort=None):
+    # Binary search for the lowest quality (VISUAL_MIN_QUALITY..level ceiling) whose
+    # decoded result scores >= threshold against img. Scoring runs on downsampled
+    # luminance, so each trial costs about one encode + one decode.
+    # Returns (encoded bytes, {"quality", "ssim", "encodes"}).
+    from .metrics import luminance, ssim
+    Image = load_pil()
+    if img.mode in ("RGBA", "P") and ext not in ALPHA_EXTS:
+        img = img.convert("RGB")
+    reference = luminance(img)
+    low, high = VISUAL_MIN_QUALITY, LEVELS["visual"][1]
+    steps = max(1, (high - low).bit_length() + 1)
+    trials = {}
+
+    def trial(quality):
+        check_cancel(cancel)
+        buf = io.BytesIO()
+        save_compressed(img, buf, ext, "visual", quality, effort)
+        buf.seek(0)
+        decoded = Image.open(buf)
+        decoded.draft("L", decoded.size)  # JPEG: decode the Y channel only
+        score = ssim(reference, luminance(decoded))
+        trials[quality] = (buf.getvalue(), score)
+        report(progress, len(trials), steps, f"quality {quality}: SSIM {score:.4f}")
+        return score
+
+    # The ceiling is the fallback when nothing lower is good enough
+    best = high
+    if trial(high) >= threshold:
+        high -= 1
+        while low <= high:
+            quality = (low + high) // 2
+            if trial(quality) >= threshold:
+                best, high = quality, quality - 1
+            else:
+                low = quality + 1
+    data, score = trials[best]
+    return data, {"quality": best, "ssim": round(score, 5), "encodes": len(trials)}
+
+def compress_image_to_size(input_path, output_path, level, target_bytes, progress=None, cancel=None,
+                           effort=None, dither=True, memory_mb=None):
+    # Target-size mode: the image is decoded and shrunk to the level's max_width
+    # once, then fit_to_size() encodes trials into memory. Only the winner is written.
+    ext = os.path.splitext(input_path)[1].lower()
+    img = open_downscaled(input_path, LEVELS[level][0], cancel, memory_mb)
+    img.load()
+    check_cancel(cancel)
+    data, details = fit_to_size(img, ext, level, target_bytes, progress=progress, cancel=cancel, effort=effort,
+                                dither=dither)
+    with open(output_path, "wb") as f:
+        f.write(data)
+    return details
+
+def fit_to_size(img, ext, level, target_bytes, max_encodes=TARGET_MAX_ENCODES, progress=None, cancel=None,
+                effort=None, dither=True):
+    # Returns (encoded bytes, details) for the best version of img under target_bytes:
+    #  1. encode at the lowest quality; while even that is too big, shrink the
+    #     width by the estimated factor (bytes grow roughly with pixel count),
+    #     each step resized from the previous one
+    #  2. after a shrink, binary-search the widest width between the fitting one and
+    #     the last too-big one (to within TARGET_WIDTH_TOLERANCE), resized from the latter
+    #  3. binary-search the highest quality that still fits at that width
+    # Every trial is an in-memory encode of the same decoded image, and there are
+    # never more than max_encodes of them. PNG/TIFF have no quality, so only step 1 runs.
+    low, high = TARGET_QUALITY
+    lossy = ext not in LOSSLESS_EXTS
+    encodes = 0
+
+    def encode(image, quality):
+        nonlocal encodes
+        check_cancel(cancel)
+        encodes += 1
+        report(progress, encodes, max_encodes, f"trial {encodes}: {image.width}px q{quality}")
+        buf = io.BytesIO()
+        save_compressed(image, buf, ext, level, quality, effort, dither=dither)
+        return buf.getvalue()
+
+    # Trials need the mode conversion; it is done once, not per trial
+    if lossy and ext in ALPHA_EXTS:
+        img = img.convert(save_mode(ext, img))
+    elif lossy and img.mode in ("RGBA", "P"):
+        img = img.convert("RGB")
+    data = encode(img, low)
+    too_big = None
+    while len(data) > target_bytes and img.width > 16 and encodes < max_encodes:
+        too_big = img
+        scale = min(0.9, (target_bytes / float(len(data))) ** 0.5 * 0.95)
+        width = max(16, int(img.width * scale))
+        img = cascade_resize(img, [width])[width]
+        data = encode(img, low)
+
+    if too_big is not None and len(data) <= target_bytes:
+        fits, over = img.width, too_big.width
+        while over - fits > max(8, over * TARGET_WIDTH_TOLERANCE) and encodes < max_encodes:
+            width = (fits + over) // 2
+            candidate = cascade_resize(too_big, [width])[width]
+            trial = encode(candidate, low)
+            if len(trial) <= target_bytes:
+                img, data, fits = candidate, trial, width
+            else:
+                over = width
+
+    best, best_quality = data, low
+    if lossy and len(data) <= target_bytes:
+        low += 1
+        while low <= high and encodes < max_encodes:
+            quality = (low + high) // 2
+            trial = encode(img, quality)
+            if len(trial) <= target_bytes:
+                best, best_quality = trial, quality
+                low = quality + 1
+            else:
+                high = quality - 1
+    details = {"quality": best_quality if lossy else None, "width": img.width, "encodes": encodes,
+               "target_bytes": target_bytes, "target_met": len(best) <= target_bytes}
+    return best, details
+
+def ladder_widths():
+    # The level table's widths, largest first: 2560, 1920, 1280, 1024
+    return sorted({width for width, _ in LEVELS.values()}, reverse=True)
+
+def compress_ladder(input_path, manifest_path, compression_level="medium", progress=None, cancel=None,
+                    effort=None, dither=True, memory_mb=None):
+    # Responsive images: one file per ladder width (photo_1920.jpg, ...) next to
+    # manifest_path, all at the level's quality, cascaded from one decode (see
+    # cascade_resize). A rung wider than the image becomes a single rung at the
+    # image's own width. The JSON manifest lists every file with its size, so
+    # nothing has to be stat-ed again later.
+    started = time.perf_counter()
+    ext = os.path.splitext(input_path)[1].lower()
+    if ext not in IMAGE_EXTS:
+        return job_result(input_path, error="Error: Ladders can only be made from images.")
+    level = level_key(compression_level)
+    qual = LEVELS[level][1]
+    folder = os.path.dirname(os.path.abspath(manifest_path))
+    # Rungs are named after the manifest (photo.ladder.json -> photo_1920.jpg), so a
+    # batch that renamed a clashing manifest (photo_png.ladder.json) renames its rungs too
+    stem = os.path.basename(manifest_path)
+    stem = stem[:-len(".ladder.json")] if stem.endswith(".ladder.json") else os.path.splitext(stem)[0]
+    # HEIC/BMP sources get JPEG rungs
+    out_ext = ext if ext in ('.png', '.jpg', '.jpeg', '.webp', '.avif') else '.jpg'
+    try:
+        widths = ladder_widths()
+        img = open_downscaled(input_path, widths[0], cancel, memory_mb)
+        img.load()
+        check_cancel(cancel)
+        rungs = {}
+        for width, rung in cascade_resize(img, widths).items():
+            rungs.setdefault(rung.width, rung)  # rungs that hit the image width collapse into one
+
+        from concurrent.futures import ThreadPoolExecutor
+        files = []
+        with ThreadPoolExecutor(max_workers=min(len(rungs), os.cpu_count() or 1)) as pool:
+            futures = []
+            for width, rung in rungs.items():
+                path = os.path.join(folder, f"{stem}_{width}{out_ext}")
+                futures.append((path, rung, pool.submit(_save_rung, rung, path, out_ext, level, qual, effort, dither)))
+            for done, (path, rung, future) in enumerate(futures, 1):
+                if cancel is not None and cancel.is_set():
+                    pool.shutdown(wait=True, cancel_futures=True)
+                    raise Cancelled("Cancelled")
+                files.append({"path": os.path.basename(path), "width": rung.width, "height": rung.height,
+                              "bytes": future.result()})
+                report(progress, done, len(futures), os.path.basename(path))
+
+        manifest = {"source": os.path.basename(input_path), "source_bytes": os.path.getsize(input_path),
+                    "level": level, "quality": qual, "files": files}
+        with atomic_output(manifest_path) as tmp_path:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(manifest, f, indent=2)
+        result = job_result(input_path, manifest_path, started=started)
+        result["files"] = files
+        result["output_bytes"] = sum(f["bytes"] for f in files)
+        result["ratio"] = result["output_bytes"] / result["input_bytes"] if result["input_bytes"] else None
+        return result
+    except Cancelled:
+        raise
+    except Exception as e:
+        return job_result(input_path, error=f"Error: {str(e)}", started=started)
+
+def _save_rung(img, output_path, ext, level, qual, effort=None, dither=True):
+    # Returns the size of the written file
+    with atomic_output(output_path) as tmp_path:
+        save_compressed(img, tmp_path, ext, level, qual, effort, dither=dither)
+        size = os.path.getsize(tmp_path)
+    return size
+
+def open_downscaled(input_path, max_width, cancel=None, memory_mb=None):
+    # Opens an image already shrunk to max_width (if it is wider).
+    # JPEG decodes at 1/2, 1/4 or 1/8 scale via draft(), HEIC picks an embedded
+    # thumbnail when one is big enough; anything else gets reduce() before LANCZOS.
+    # Images too big to decode within memory_limit(memory_mb) are resampled in
+    # bands when their format allows it (see bands.py), refused otherwise.
+    Image = load_pil()
+    img = open_image(input_path)
+    if img.width <= max_width:
+        check_memory(img, memory_mb)
+        return img
+
+    ratio = max_width / float(img.width)
+    target = (max_width, max(1, int(float(img.height) * ratio)))
+    img.draft(None, target)
+    if img.width <= target[0]:
+        return img
+    if decoded_bytes(img) > memory_limit(memory_mb) and can_band(img, memory_mb):
+        return open_banded(input_path, target, cancel, memory_mb)
+    check_memory(img, memory_mb)
+    return img.resize(target, Image.Resampling.LANCZOS, reducing_gap=REDUCING_GAP)
+
+def cascade_resize(img, widths):
+    # {width: image} for a ladder of widths, largest first. Each step is resized
+    # from the previous (already smaller) step rather than from the original,
+    # so the small sizes cost next to nothing. Never enlarges.
+    Image = load_pil()
+    sized = {}
+    current = img
+    for width in sorted(set(widths), reverse=True):
+        if current.width > width:
+            target = (width, max(1, int(float(current.height) * width / current.width)))
+            current = current.resize(target, Image.Resampling.LANCZOS, reducing_gap=REDUCING_GAP)
+        sized[width] = current
+    return sized
+
+# --- B. PDF COMPRESSION ---
+# See pdf.py: page ranges are compressed in parallel, embedded images are
+# downsampled to PDF_IMAGE_DPI, and shared objects are deduplicated.
+
+
+# --- 4. BATCH RUNNER (headless, no Tk) ---
+
+def collect_inputs(patterns, exts=None):
+    # Expands directories (recursively) and glob patterns into a sorted file list.
+    # Returns (root, path) pairs so outputs can mirror the input tree.
+    found = []
+    seen = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            root = pattern
+            matches = []
+            for dirpath, _, filenames in os.walk(pattern):
+                matches.extend(os.path.join(dirpath, f) for f in filenames)
+        else:
+            root = None
+            matches = glob.glob(pattern, recursive=True) if glob.has_magic(pattern) else [pattern]
+        for path in sorted(matches):
+            if not os.path.isfile(path):
+                continue
+            if exts and os.path.splitext(path)[1].lower() not in exts:
+                continue
+            key = os.path.abspath(path)
+            if key in seen:
+                continue
+            seen.add(key)
+            found.append((root or os.path.dirname(path), path))
+    return found
+
+def output_path_for(input_path, root, output_dir, suffix="", ext=None):
+    # With no output_dir the file is written next to its source (like the GUI's Save-As suggestion).
+    base, src_ext = os.path.splitext(input_path)
+    name = os.path.basename(base) + suffix + (ext or src_ext)
+    if not output_dir:
+        return os.path.join(os.path.dirname(input_path), name)
+    rel_dir = os.path.relpath(os.path.dirname(input_path) or ".", root or ".")
+    return os.path.normpath(os.path.join(output_dir, rel_dir, name))
+
+def _is_rung(path):
+    # photo_1920.jpg next to photo.ladder.json came out of an earlier ladder run
+    stem = os.path.splitext(path)[0]
+    return re.search(r"_\d+$", stem) is not None and os.path.isfile(re.sub(r"_\d+$", "", stem) + ".ladder.json")
+
+def _unique_outputs(inputs, name, written=lambda output: [output]):
+    # inputs: (root, path); name(root, path, tag) -> output path, tag goes before the
+    # suffix; written(output) -> every file that job writes (derive: one per target).
+    # Two inputs that would write the same file (photo.png and photo.webp -> photo.jpg),
+    # or a job that would overwrite another input, keep the source extension in the
+    # name instead: photo_png.jpg, photo_webp.jpg. Returns (jobs, clashes): clashes are
+    # the (input, output) pairs that still collide (photo.png and photo.PNG) and are not run.
+    def same(path):
+        return os.path.normcase(os.path.abspath(path))
+
+    def files(path, output):
+        # A job writing its own input is skipped by the job itself
+        return {same(f) for f in written(output)} - {same(path)}
+
+    outputs = [name(root, path, "") for root, path in inputs]
+    counts = {}
+    for (_, path), output in zip(inputs, outputs):
+        for f in files(path, output):
+            counts[f] = counts.get(f, 0) + 1
+    sources = {same(path) for _, path in inputs}
+    jobs, clashes, taken = [], [], set()
+    for (root, path), output in zip(inputs, outputs):
+        if any(counts[f] > 1 or f in sources for f in files(path, output)):
+            output = name(root, path, "_" + os.path.splitext(path)[1][1:].lower())
+        if files(path, output) & (taken | sources):
+            clashes.append((path, output))
+            continue
+        taken |= files(path, output)
+        jobs.append((path, output))
+    return jobs, clashes
+
+def _run_job(task, input_path, output_path, option, cache, effort=None, cores=None, dither=True, memory_mb=None):
+    # Top-level so it can be pickled into worker processes.
+    # The worker's cache report (counters, bytes stored) is sent back so the parent can total them.
+    # cores: this job's share of the machine (see run_batch)
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    if task == "compress":
+        # option: level, or (level, target_bytes)
+        level, target_bytes = option if isinstance(option, tuple) else (option, None)
+        result = compress_logic(input_path, output_path, level, cache, target_bytes=target_bytes, effort=effort,
+                                cores=cores, dither=dither, memory_mb=memory_mb)
+    elif task == "ladder":
+        result = compress_ladder(input_path, output_path, option, effort=effort, dither=dither, memory_mb=memory_mb)
+    elif task == "thumbs":
+        # option: (count, columns, level, format); the format is already in output_path
+        count, columns, level, _ = option
+        result = video_sheet(input_path, output_path, count, columns, level, effort)
+    elif task == "derive":
+        # Never overwrite the source with its own full-size re-encode
+        targets = [t for t in image_targets(output_path, *option)
+                   if os.path.abspath(t[0]) != os.path.abspath(input_path)]
+        results = convert_image_targets(input_path, targets, cache, effort=effort, memory_mb=memory_mb)
+        errors = [f"{os.path.basename(o)}: {r}" for o, r in results if result_error(r)]
+        result = "Error: " + "; ".join(errors) if errors else ", ".join(r for _, r in results)
+    else:
+        result = process_conversion(input_path, output_path, option, cache, effort=effort, cores=cores,
+                                    memory_mb=memory_mb)
+    return input_path, result, (cache.report() if cache else None)
+
+def run_batch(task, patterns, option, output_dir=None, workers=None, on_result=None, cache=None, effort=None,
+              dither=True, memory_mb=None):
+    # task: "compress" (option = level or (level, target_bytes)), "convert" (option = target format) or
+    # "derive" (option = (formats, widths): several outputs per image, see image_targets)
+    # or "ladder" (option = level: responsive widths + manifest, see compress_ladder)
+    # or "thumbs" (option = (count, columns, level, format): poster frame / contact sheet per video)
+    # cache: optional ResultCache shared by all workers (its counters are merged here)
+    # effort: WebP/AVIF encoder tier for every job (see EFFORTS)
+    # dither: Extreme PNGs dithered or not (compress and ladder, see compress_logic)
+    # memory_mb: decoded-pixel limit of every image job (see bands.memory_limit)
+    suffix, ext, written = "", None, lambda output: [output]
+    if task == "compress":
+        inputs = [(root, path) for root, path in collect_inputs(patterns, COMPRESS_EXTS)
+                  if not os.path.splitext(path)[0].endswith("_compressed")]
+        suffix = "_compressed"
+    elif task == "ladder":
+        inputs = [(root, path) for root, path in collect_inputs(patterns, IMAGE_EXTS) if not _is_rung(path)]
+        suffix, ext = ".ladder", ".json"
+    elif task == "thumbs":
+        inputs = collect_inputs(patterns, VIDEO_EXTS)
+        suffix, ext = ("_poster" if option[0] == 1 else "_sheet"), "." + option[3]
+    elif task == "derive":
+        inputs = collect_inputs(patterns, IMAGE_EXTS)
+        written = lambda output: [target[0] for target in image_targets(output, *option)]
+    else:
+        inputs = collect_inputs(patterns, IMAGE_EXTS + VIDEO_EXTS)
+        ext = "." + option
+        # Skip files that are already in the target format and would overwrite themselves
+        inputs = [(root, path) for root, path in inputs
+                  if os.path.abspath(path) != os.path.abspath(output_path_for(path, root, output_dir, ext=ext))]
+    jobs, clashes = _unique_outputs(
+        list(inputs), lambda root, path, tag: output_path_for(path, root, output_dir, tag + suffix, ext), written)
+
+    results = []
+    for input_path, output_path in clashes:
+        result = f"Error: {os.path.basename(output_path)} is already written by another input"
+        results.append((input_path, result))
+        if on_result:
+            on_result(input_path, result)
+    if not jobs:
+        return results
+
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    workers = max(1, min(workers or os.cpu_count() or 1, len(jobs)))
+    # Each job gets its share of the cores for its own parallel work (video chunks,
+    # PDF page ranges): one long recording alone still uses the whole machine
+    cores = max(1, (os.cpu_count() or 1) // workers)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(_run_job, task, i, o, option, cache, effort, cores, dither, memory_mb): i for i, o in jobs}
+        for future in as_completed(futures):
+            try:
+                input_path, result, report = future.result()
+                if report:
+                    cache.merge(report)
+            except Exception as e:
+                input_path, result = futures[future], f"Error: {str(e)}"
+            results.append((input_path, result))
+            if on_result:
+                on_result(input_path, result)
+    return results
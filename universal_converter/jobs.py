@@ -0,0 +1,127 @@
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Job scheduler shared by the GUI and headless callers.
+# Every job gets an ID, a state, a progress fraction and its own cancel token
+# (a threading.Event). Work runs on a bounded thread pool - the heavy lifting
+# happens in ffmpeg/Pillow/pypdf, which do not hold the GIL - and listeners
+# are told about every state or progress change.
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+
+class Cancelled(Exception):
+    pass
+
+
+def check_cancel(cancel):
+    # Long-running logic calls this between steps (pages, frames, chunks)
+    if cancel is not None and cancel.is_set():
+        raise Cancelled("Cancelled")
+
+def report(progress, done, total, detail=""):
+    # progress(fraction, detail) callbacks are optional everywhere
+    if progress is not None and total:
+        progress(min(1.0, done / float(total)), detail)
+
+
+class Job:
+    def __init__(self, job_id, kind, name):
+        self.id = job_id
+        self.kind = kind      # "convert", "compress", "download", ...
+        self.name = name      # what the user sees, usually the file name
+        self.state = QUEUED
+        self.progress = 0.0
+        self.detail = ""
+        self.result = None
+        self.cancel_token = threading.Event()
+        self.created = time.time()
+
+    @property
+    def finished(self):
+        return self.state in (DONE, FAILED, CANCELLED)
+
+    def cancel(self):
+        self.cancel_token.set()
+
+
+class JobScheduler:
+    def __init__(self, max_workers=2):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="uc-job")
+        self._ids = itertools.count(1)
+        self._jobs = {}
+        self._listeners = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, listener):
+        # listener(job) is called from worker threads on every change;
+        # the GUI hops over to the Tk thread itself (app.after)
+        self._listeners.append(listener)
+
+    def _emit(self, job):
+        for listener in list(self._listeners):
+            try:
+                listener(job)
+            except Exception:
+                pass
+
+    def submit(self, kind, name, func, *args, **kwargs):
+        # func is called as func(*args, progress=..., cancel=..., **kwargs)
+        with self._lock:
+            job = Job(next(self._ids), kind, name)
+            self._jobs[job.id] = job
+        self._emit(job)
+        self._pool.submit(self._run, job, func, args, kwargs)
+        return job
+
+    def _run(self, job, func, args, kwargs):
+        if job.cancel_token.is_set():
+            job.state = CANCELLED
+            return self._emit(job)
+
+        job.state = RUNNING
+        self._emit(job)
+
+        def progress(fraction, detail=""):
+            job.progress = fraction
+            job.detail = detail
+            self._emit(job)
+
+        try:
+            job.result = func(*args, progress=progress, cancel=job.cancel_token, **kwargs)
+            job.state = DONE
+            job.progress = 1.0
+        except Cancelled:
+            job.state = CANCELLED
+            job.result = "Cancelled"
+        except Exception as e:
+            job.state = FAILED
+            job.result = f"Error: {str(e)}"
+        self._emit(job)
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def jobs(self, active_only=False):
+        return [j for j in self._jobs.values() if not (active_only and j.finished)]
+
+    def cancel(self, job_id=None, kind=None):
+        # Cancels one job, or every unfinished job (of one kind)
+        for job in self.jobs(active_only=True):
+            if (job_id is None or job.id == job_id) and (kind is None or job.kind == kind):
+                job.cancel()
+
+    def forget_finished(self):
+        with self._lock:
+            self._jobs = {i: j for i, j in self._jobs.items() if not j.finished}
+
+    def shutdown(self, cancel=True):
+        if cancel:
+            self.cancel()
+        self._pool.shutdown(wait=False)
@@ -0,0 +1,160 @@
+import os
+import sys
+import shutil
+import struct
+
+from .tools import run_tool
+
+# Lossless JPEG optimizer (the "low" level).
+# Works on the compressed data only, never on pixels, so there is no generation loss:
+# - metadata segments (EXIF incl. its thumbnail, XMP, IPTC, comments, MPF
+#   preview images) are dropped; the ICC profile, JFIF/Adobe headers and the
+#   EXIF orientation (as a 26-byte EXIF block) are kept, so the image looks the same
+# - with jpegtran on PATH (or bundled with the app), the Huffman tables are also optimized and the scans
+#   rewritten as progressive (jpegtran re-packs the DCT coefficients losslessly)
+
+SOI, EOI, SOS = 0xD8, 0xD9, 0xDA
+APP0, APP1, APP2, APP13, APP14, COM = 0xE0, 0xE1, 0xE2, 0xED, 0xEE, 0xFE
+# Markers without a length field
+_STANDALONE = {0x01, SOI, EOI} | set(range(0xD0, 0xD8))
+
+_ICC_ID = b"ICC_PROFILE\x00"
+_EXIF_ID = b"Exif\x00\x00"
+_ORIENTATION = 0x0112
+
+
+def find_jpegtran():
+    path = shutil.which("jpegtran")
+    if path:
+        return path
+    # The PyInstaller build ships its own copy next to the app's files (see the .spec)
+    bundle = getattr(sys, "_MEIPASS", None)
+    return shutil.which("jpegtran", path=bundle) if bundle and os.path.isdir(bundle) else None
+
+
+# --- SEGMENTS ---
+
+def read_segments(data):
+    # ([(marker, segment bytes incl. marker)] up to the first SOS, image data from
+    # the first SOS up to and including EOI). Anything after EOI (MPF preview
+    # images, trailing junk) is not part of the image and is left out.
+    if data[:2] != b"\xff\xd8":
+        raise ValueError("Not a JPEG file")
+    segments = []
+    pos = 2
+    while True:
+        # Fill bytes (0xFF padding) may precede a marker
+        while pos < len(data) and data[pos] == 0xFF and pos + 1 < len(data) and data[pos + 1] == 0xFF:
+            pos += 1
+        if pos + 4 > len(data) or data[pos] != 0xFF:
+            raise ValueError("Corrupt JPEG: bad marker")
+        marker = data[pos + 1]
+        if marker in _STANDALONE:
+            pos += 2
+            continue
+        length = struct.unpack(">H", data[pos + 2:pos + 4])[0]
+        if marker == SOS:
+            return segments, data[pos:_find_eoi(data, pos + 2 + length)]
+        segments.append((marker, data[pos:pos + 2 + length]))
+        pos += 2 + length
+
+def _find_eoi(data, pos):
+    # End of the image data: the first 0xFF D9 that is a real marker. Inside
+    # entropy-coded data 0xFF is always followed by 0x00 (stuffing) or a
+    # restart marker, so finding 0xFF bytes is all the scanning needed.
+    while True:
+        pos = data.find(b"\xff", pos)
+        if pos < 0 or pos + 1 >= len(data):
+            raise ValueError("Corrupt JPEG: no end of image")
+        if data[pos + 1] == EOI:
+            return pos + 2
+        pos += 1
+
+def _orientation(segments):
+    from PIL import Image
+    for marker, segment in segments:
+        if marker == APP1 and segment[4:10] == _EXIF_ID:
+            exif = Image.Exif()
+            try:
+                exif.load(segment[4:])
+            except Exception:
+                return 1  # unreadable EXIF: nothing to keep
+            orientation = exif.get(_ORIENTATION, 1)
+            return orientation if orientation in range(1, 9) else 1
+    return 1
+
+def orientation_segment(orientation):
+    # APP1 EXIF block holding only the Orientation tag (big-endian TIFF, one IFD entry)
+    tiff = b"MM\x00\x2a" + struct.pack(">I", 8) + struct.pack(">H", 1) + \
+        struct.pack(">HHIHH", _ORIENTATION, 3, 1, orientation, 0) + struct.pack(">I", 0)
+    payload = _EXIF_ID + tiff
+    return b"\xff\xe1" + struct.pack(">H", len(payload) + 2) + payload
+
+def _keep(marker, segment):
+    # Everything that changes how the pixels decode stays (tables, frame header,
+    # restart interval, JFIF/Adobe colour transform, ICC); metadata goes
+    if marker == COM or (APP0 < marker <= 0xEF and marker not in (APP2, APP14)):
+        return False
+    if marker == APP0:
+        # JFIF header yes, JFXX thumbnail no
+        return segment[4:9] == b"JFIF\x00"
+    if marker == APP2:
+        return segment[4:4 + len(_ICC_ID)] == _ICC_ID
+    return True
+
+def strip_metadata(data):
+    # Returns (JPEG bytes without metadata, orientation)
+    segments, image = read_segments(data)
+    orientation = _orientation(segments)
+    header = [segment for marker, segment in segments if _keep(marker, segment)]
+    extra = [orientation_segment(orientation)] if orientation != 1 else []
+    return _assemble(header, extra, image), orientation
+
+def _assemble(header, extra, image):
+    # JFIF must stay the first segment; extra segments follow it
+    first = 1 if header and header[0][1] == APP0 else 0
+    return b"".join([b"\xff\xd8"] + header[:first] + extra + header[first:] + [image])
+
+def primary_image(data):
+    # Multi-picture JPEG (MPO, from cameras and phones) -> plain JPEG of its first
+    # image: the MPF index and the images after EOI go, everything else stays
+    segments, image = read_segments(data)
+    header = [segment for marker, segment in segments if not (marker == APP2 and segment[4:8] == b"MPF\x00")]
+    return b"".join([b"\xff\xd8"] + header + [image])
+
+def _icc_segments(data):
+    segments, _ = read_segments(data)
+    return [segment for marker, segment in segments if marker == APP2 and _keep(marker, segment)]
+
+
+# --- OPTIMIZE ---
+
+def _jpegtran(jpegtran, data):
+    # Huffman optimization + progressive scans, all metadata dropped (re-added by the caller)
+    proc = run_tool([jpegtran, "-copy", "none", "-optimize", "-progressive"], text=False, input=data)
+    if proc.returncode != 0 or not proc.stdout:
+        raise ValueError(proc.stderr.decode(errors="replace").strip() or "jpegtran failed")
+    return proc.stdout
+
+def optimize_jpeg(input_path, output_path):
+    # Lossless: the DCT coefficients are never touched. Returns details for the job result.
+    with open(input_path, "rb") as f:
+        data = f.read()
+    stripped, orientation = strip_metadata(data)
+    metadata_bytes = len(data) - len(stripped)
+    method = "segments"
+    jpegtran = find_jpegtran()
+    if jpegtran:
+        try:
+            optimized = _jpegtran(jpegtran, stripped)
+            # jpegtran wrote no APPn at all: put the ICC profile and orientation back
+            segments, image = read_segments(optimized)
+            extra = _icc_segments(stripped) + ([orientation_segment(orientation)] if orientation != 1 else [])
+            candidate = _assemble([segment for _, segment in segments], extra, image)
+            if len(candidate) < len(stripped):
+                stripped, method = candidate, "jpegtran"
+        except (OSError, ValueError):
+            pass  # the segment-level result is still valid
+    with open(output_path, "wb") as f:
+        f.write(stripped)
+    return {"lossless": True, "method": method, "metadata_bytes": metadata_bytes}
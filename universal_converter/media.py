@@ -0,0 +1,517 @@
+import os
+import re
+import json
+import shutil
+import tempfile
+import threading
+import subprocess
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+
+from .jobs import Cancelled
+from .tools import run_tool, popen_tool
+
+# Direct ffmpeg pipeline for video conversion and audio extraction.
+# The input is probed first; streams whose codec the target container can
+# hold are copied as-is (remux, no decode), everything else is re-encoded by
+# ffmpeg itself instead of round-tripping frames through Python.
+# Long videos that need a video re-encode are cut into time ranges and the
+# ranges are encoded by several ffmpeg processes at once (see segmented_transcode).
+
+# Codecs each target container can carry without re-encoding
+CONTAINER_CODECS = {
+    "mp4": {
+        "video": {"h264", "hevc", "mpeg4", "av1", "vp9"},
+        "audio": {"aac", "mp3", "ac3", "eac3", "alac", "opus"},
+    },
+    "mov": {
+        "video": {"h264", "hevc", "mpeg4", "prores", "mjpeg"},
+        "audio": {"aac", "mp3", "ac3", "alac", "pcm_s16le"},
+    },
+    # Matroska holds practically anything
+    "mkv": {"video": None, "audio": None},
+}
+
+# Audio-only targets: (codecs that can be stream-copied, encoder args otherwise)
+AUDIO_TARGETS = {
+    "mp3": ({"mp3"}, ["-c:a", "libmp3lame", "-q:a", "2"]),
+    "wav": ({"pcm_s16le"}, ["-c:a", "pcm_s16le"]),
+}
+
+# Used when a stream has to be re-encoded. x264's "fast" preset and automatic
+# threading behave the same on every machine (no GPU encoders involved).
+VIDEO_ENCODE = ["-c:v", "libx264", "-preset", "fast", "-crf", "23", "-pix_fmt", "yuv420p"]
+AUDIO_ENCODE = ["-c:a", "aac", "-b:a", "192k"]
+THREADS = ["-threads", "0"]
+
+# Segmented transcode: only videos at least this long are split, into chunks of
+# at least SEGMENT_MIN_CHUNK seconds. There are CHUNKS_PER_WORKER chunks per
+# encoder process, so one slow chunk (some content encodes slower) does not
+# leave the other cores idle at the end.
+SEGMENT_MIN_SECONDS = 60
+SEGMENT_MIN_CHUNK = 10
+CHUNKS_PER_WORKER = 2
+
+# Video compression (see compress_video). x264's default preset: the compressor
+# is after size, not speed.
+COMPRESS_ENCODE = ["-c:v", "libx264", "-preset", "medium", "-pix_fmt", "yuv420p"]
+# Quick bitrate probe: this many seconds from the middle are encoded first, and
+# a video whose estimate is above SKIP_RATIO of its current size is not compressed
+PROBE_SECONDS = 4
+SKIP_RATIO = 0.95
+# Audio codec per container when it has to be re-encoded (AVI has no proper AAC support)
+AUDIO_CODECS = {"avi": "libmp3lame"}
+# Two-pass target size: muxing bytes per packet (chunk headers + index entries),
+# audio packets per second (AAC/MP3 frames), and headroom for rate-control overshoot
+PACKET_OVERHEAD = {"avi": 24, "flv": 15}
+DEFAULT_PACKET_OVERHEAD = 12
+AUDIO_PACKETS_PER_SECOND = 45
+RATE_HEADROOM = 0.97
+
+
+class MediaError(Exception):
+    pass
+
+
+# --- TOOLS ---
+
+def find_ffmpeg():
+    path = shutil.which("ffmpeg")
+    if path:
+        return path
+    try:
+        # MoviePy installs a bundled ffmpeg through imageio-ffmpeg
+        import imageio_ffmpeg
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except Exception:
+        raise MediaError("ffmpeg was not found. Install it or add it to PATH.")
+
+def run_ffmpeg(cmd, duration=None, total_frames=None, progress=None, cancel=None):
+    # Runs an ffmpeg command built as [ffmpeg, ...]. With a progress callback or a
+    # cancel token, ffmpeg's -progress output is followed: percent comes from the
+    # frame counter when the frame total is known, else from the output timestamp,
+    # and the number of frames written is returned.
+    if progress is None and cancel is None:
+        proc = run_tool(cmd)
+        if proc.returncode != 0:
+            raise MediaError(proc.stderr.strip() or "ffmpeg failed")
+        return
+
+    cmd = cmd[:1] + ["-progress", "pipe:1", "-nostats"] + cmd[1:]
+    proc = popen_tool(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, stdin=subprocess.DEVNULL,
+                      text=True, errors="replace")
+    # stderr is drained on the side so a chatty ffmpeg can never block on a full pipe
+    errors = []
+    drain = threading.Thread(target=lambda: errors.extend(proc.stderr), daemon=True)
+    drain.start()
+
+    frame = 0
+    for line in proc.stdout:
+        if cancel is not None and cancel.is_set():
+            proc.kill()
+            proc.wait()
+            raise Cancelled("Cancelled")
+        key, _, value = line.strip().partition("=")
+        if key == "frame" and value.isdigit():
+            frame = int(value)
+        elif key == "out_time_us" and value.isdigit() and progress:
+            if total_frames and frame:
+                progress(min(1.0, frame / float(total_frames)), f"frame {frame}/{total_frames}")
+            elif duration:
+                seconds = int(value) / 1e6
+                progress(min(1.0, seconds / duration), f"{seconds:.0f}s / {duration:.0f}s")
+    proc.wait()
+    drain.join()
+    if proc.returncode != 0:
+        raise MediaError("".join(errors).strip() or "ffmpeg failed")
+    return frame
+
+
+# --- PROBE ---
+
+_STREAM_RE = re.compile(r"Stream #\d+:(\d+)(?:\[\w+\])?(?:\(\w+\))?: (Video|Audio|Subtitle|Data|Attachment): (\w+)(.*)")
+_FPS_RE = re.compile(r"(\d+(?:\.\d+)?) fps")
+_DURATION_RE = re.compile(r"Duration: (\d+):(\d+):(\d+(?:\.\d+)?)")
+
+def probe(input_path):
+    # Returns {"duration": seconds or None, "streams": [{"index", "type", "codec", "fps"}, ...]}
+    ffprobe = shutil.which("ffprobe")
+    if ffprobe:
+        proc = run_tool([ffprobe, "-v", "error", "-print_format", "json",
+                     "-show_entries", "format=duration:stream=index,codec_type,codec_name,avg_frame_rate",
+                     input_path])
+        if proc.returncode != 0:
+            raise MediaError(proc.stderr.strip() or "Could not read media file")
+        info = json.loads(proc.stdout or "{}")
+        duration = info.get("format", {}).get("duration")
+        return {
+            "duration": float(duration) if duration else None,
+            "streams": [{"index": s["index"], "type": s.get("codec_type"), "codec": s.get("codec_name"),
+                         "fps": _rate(s.get("avg_frame_rate"))}
+                        for s in info.get("streams", [])],
+        }
+
+    # No ffprobe (e.g. only MoviePy's bundled ffmpeg): parse the banner of `ffmpeg -i`
+    proc = run_tool([find_ffmpeg(), "-hide_banner", "-i", input_path])
+    streams = []
+    for index, kind, codec, rest in _STREAM_RE.findall(proc.stderr):
+        fps = _FPS_RE.search(rest)
+        streams.append({"index": int(index), "type": kind.lower(), "codec": codec,
+                        "fps": _exact_fps(float(fps.group(1))) if fps else None})
+    if not streams:
+        raise MediaError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "Could not read media file")
+    match = _DURATION_RE.search(proc.stderr)
+    duration = None
+    if match:
+        h, m, s = match.groups()
+        duration = int(h) * 3600 + int(m) * 60 + float(s)
+    return {"duration": duration, "streams": streams}
+
+# The banner rounds NTSC rates (23.98 fps); over a long video that adds up to whole frames
+_NTSC_RATES = {round(n / 1001.0, 2): n / 1001.0 for n in (24000, 30000, 48000, 60000, 120000)}
+
+def _exact_fps(fps):
+    return _NTSC_RATES.get(fps, fps)
+
+def _rate(value):
+    # "30000/1001" -> 29.97
+    try:
+        num, _, den = (value or "").partition("/")
+        return float(num) / float(den or 1) or None
+    except (ValueError, ZeroDivisionError):
+        return None
+
+def total_frames(info):
+    videos = streams_of(info, "video")
+    if info["duration"] and videos and videos[0].get("fps"):
+        return int(info["duration"] * videos[0]["fps"])
+    return None
+
+def streams_of(info, kind):
+    return [s for s in info["streams"] if s["type"] == kind]
+
+def can_copy(codec, kind, container):
+    allowed = CONTAINER_CODECS.get(container, {}).get(kind, set())
+    return allowed is None or codec in allowed
+
+
+# --- VIDEO CONVERSION ---
+
+def plan_video(info, container):
+    # ffmpeg arguments for the first video stream and every audio stream,
+    # copying whichever of them the container accepts
+    videos = streams_of(info, "video")
+    audios = streams_of(info, "audio")
+    if not videos:
+        raise MediaError("This file has no video track!")
+
+    args = ["-map", f"0:{videos[0]['index']}"]
+    for a in audios:
+        args += ["-map", f"0:{a['index']}"]
+
+    video_copy = can_copy(videos[0]["codec"], "video", container)
+    audio_copy = all(can_copy(a["codec"], "audio", container) for a in audios)
+    args += ["-c:v", "copy"] if video_copy else VIDEO_ENCODE
+    if audios:
+        args += ["-c:a", "copy"] if audio_copy else AUDIO_ENCODE
+    if container in ("mp4", "mov"):
+        args += ["-movflags", "+faststart"]
+    return args, video_copy and audio_copy
+
+def convert_video(input_path, output_path, output_format, info=None, progress=None, cancel=None, workers=None):
+    # Returns "remux" when every stream was copied, "segmented" when the video was
+    # encoded in parallel chunks (workers: encoder processes, default one per core),
+    # "transcode" otherwise
+    container = output_format.lower()
+    info = info or probe(input_path)
+    args, remux = plan_video(info, container)
+    video = streams_of(info, "video")[0]
+    if not can_copy(video["codec"], "video", container):
+        workers = segment_workers() if workers is None else workers
+        if segment_cuts(info["duration"], video.get("fps"), workers) and \
+                segmented_transcode(input_path, output_path, container, info, workers, progress, cancel):
+            return "segmented"
+    cmd = [find_ffmpeg(), "-hide_banner", "-loglevel", "error", "-y", "-i", input_path]
+    cmd += args + ([] if remux else THREADS) + ["-f", _muxer(container), output_path]
+    run_ffmpeg(cmd, info["duration"], total_frames(info), progress, cancel)
+    return "remux" if remux else "transcode"
+
+
+# --- SEGMENTED TRANSCODE ---
+
+def segment_workers():
+    # Default when the caller gives no count: one encoder per core, or just one inside
+    # a worker process (run_batch passes each job its share of the cores instead)
+    return 1 if multiprocessing.parent_process() is not None else os.cpu_count() or 1
+
+def segment_cuts(duration, fps, workers):
+    # Frame numbers where chunks start (after the first), [] when the video is not
+    # worth splitting. Needs the frame rate: without it frames cannot be counted.
+    if not duration or not fps or duration < SEGMENT_MIN_SECONDS or workers < 2:
+        return []
+    chunks = int(min(workers * CHUNKS_PER_WORKER, duration // SEGMENT_MIN_CHUNK))
+    if chunks < 2:
+        return []
+    step = duration * fps / chunks
+    return [int(step * i) for i in range(1, chunks)]
+
+def segmented_transcode(input_path, output_path, container, info, workers, progress=None, cancel=None,
+                        video_args=None, audio_args=None):
+    # video_args/audio_args: encoder arguments (default VIDEO_ENCODE, and audio
+    # copied when the container takes it, else AUDIO_ENCODE)
+    # 1. `workers` concurrent ffmpeg processes each decode their own range of the
+    #    original (input seek to the keyframe before it, then the trim filter on
+    #    the source timestamps) and encode it; audio is copied or encoded once,
+    #    by one more process next to them
+    # 2. the encoded chunks are joined with the concat demuxer and the audio is
+    #    muxed back in (stream copy: no second encode, no quality loss at the seams)
+    # Ranges end half a frame before a frame's timestamp, so every frame lands in
+    # exactly one chunk, and each chunk's frame count is checked. Returns False
+    # (nothing written) when a count is off, e.g. for a variable frame rate
+    # source; the caller then encodes in one piece.
+    ffmpeg = find_ffmpeg()
+    base = [ffmpeg, "-hide_banner", "-loglevel", "error", "-y"]
+    video = streams_of(info, "video")[0]
+    audios = streams_of(info, "audio")
+    threads = ["-threads", str(max(1, (os.cpu_count() or 1) // workers))]
+    fps = video["fps"]
+    _, first_pts = grab_frame(input_path, 0, cancel)
+    if first_pts is None:
+        return False
+    starts = [0] + segment_cuts(info["duration"], fps, workers)
+    # (seconds from the start, first frame, frame count or None for "to the end")
+    chunks = [(first / fps, first, starts[i + 1] - first if i + 1 < len(starts) else None)
+              for i, first in enumerate(starts)]
+
+    tmp_dir = tempfile.mkdtemp(prefix="uc-video-", dir=os.path.dirname(os.path.abspath(output_path)))
+    try:
+        # Seconds encoded per chunk, summed into one progress value
+        done = [0.0] * len(chunks)
+        total = info["duration"]
+        lock = threading.Lock()
+
+        def encode(i, offset, first, count):
+            length = count / fps if count else total - offset
+            def chunk_progress(fraction, detail):
+                with lock:
+                    done[i] = fraction * length
+                    encoded = sum(done)
+                if progress:
+                    progress(min(1.0, encoded / total), f"{encoded:.0f}s / {total:.0f}s ({len(chunks)} chunks)")
+            bounds = [f"start={first_pts + (first - 0.5) / fps:.6f}"] if first else []
+            if count:
+                bounds.append(f"end={first_pts + (first + count - 0.5) / fps:.6f}")
+            trim = "trim=" + ":".join(bounds)
+            args = list(video_args or VIDEO_ENCODE)
+            filters = [trim, "setpts=PTS-STARTPTS"]
+            if "-vf" in args:
+                at = args.index("-vf")
+                filters.append(args[at + 1])
+                del args[at:at + 2]
+            out = os.path.join(tmp_dir, f"enc{i:04d}.mkv")
+            # -copyts keeps the source timestamps up to trim, so the ranges meet exactly.
+            # The seek lands a second early (the video may start after the audio).
+            frames = run_ffmpeg(base + ["-noaccurate_seek", "-ss", f"{max(0.0, offset - 1):.6f}", "-copyts",
+                                        "-i", input_path, "-map", f"0:{video['index']}", "-an", "-sn", "-dn",
+                                        "-vf", ",".join(filters)] + args + threads + ["-f", "matroska", out],
+                                length, None, chunk_progress, cancel)
+            return out, frames
+
+        audio_path = os.path.join(tmp_dir, "audio.mka")
+        audio_copy = all(can_copy(a["codec"], "audio", container) for a in audios)
+        # Threads here only wait on ffmpeg processes; the encoding runs in those
+        with ThreadPoolExecutor(max_workers=workers + 1) as pool:
+            audio_job = None
+            if audios:
+                if audio_args is None:
+                    audio_args = ["-c:a", "copy"] if audio_copy else AUDIO_ENCODE
+                audio_job = pool.submit(run_ffmpeg, base + ["-i", input_path, "-map", "0:a", "-vn", "-sn", "-dn"]
+                                        + audio_args + ["-f", "matroska", audio_path], cancel=cancel)
+            futures = [pool.submit(encode, i, *chunk) for i, chunk in enumerate(chunks)]
+            try:
+                encoded = [future.result() for future in futures]
+                if audio_job:
+                    audio_job.result()
+            except BaseException:
+                pool.shutdown(wait=True, cancel_futures=True)
+                raise
+
+        # A chunk with a frame too many or too few would shift everything after it against the audio
+        if any(count and frames != count for (_, frames), (_, _, count) in zip(encoded, chunks)):
+            return False
+
+        concat_path = os.path.join(tmp_dir, "concat.txt")
+        with open(concat_path, "w", encoding="utf-8") as f:
+            f.writelines(f"file '{os.path.basename(path)}'\n" for path, _ in encoded)
+        cmd = base + ["-f", "concat", "-safe", "0", "-i", concat_path]
+        cmd += (["-i", audio_path, "-map", "0:v", "-map", "1:a"] if audios else ["-map", "0:v"]) + ["-c", "copy"]
+        if container in ("mp4", "mov"):
+            cmd += ["-movflags", "+faststart"]
+        run_ffmpeg(cmd + ["-f", _muxer(container), output_path], cancel=cancel)
+        return True
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+# --- VIDEO COMPRESSION ---
+
+def _scale_args(max_width):
+    # Only shrinks; width and height stay even (4:2:0 needs that)
+    return ["-vf", f"scale='min({max_width},trunc(iw/2)*2)':-2"]
+
+def _audio_args(container, bitrate):
+    return ["-c:a", AUDIO_CODECS.get(container, "aac"), "-b:a", bitrate]
+
+def _parse_bitrate(value):
+    # "128k" -> 128000
+    value = value.lower()
+    return int(float(value[:-1]) * 1000) if value.endswith("k") else int(value)
+
+def estimate_size(input_path, info, video_args, audio_bitrate, cancel=None):
+    # Output size estimate from encoding PROBE_SECONDS out of the middle of the
+    # video (input seek, so only that part is decoded). None for short videos.
+    duration = info["duration"]
+    if not duration or duration < PROBE_SECONDS * 3:
+        return None
+    fd, sample_path = tempfile.mkstemp(prefix=".probe-", suffix=".mkv")
+    os.close(fd)
+    try:
+        run_ffmpeg([find_ffmpeg(), "-hide_banner", "-loglevel", "error", "-y",
+                    "-ss", str(duration / 2 - PROBE_SECONDS / 2), "-t", str(PROBE_SECONDS), "-i", input_path,
+                    "-map", "0:v:0"] + video_args + THREADS + ["-f", "matroska", sample_path], cancel=cancel)
+        video_bytes = os.path.getsize(sample_path) / float(PROBE_SECONDS) * duration
+    finally:
+        os.remove(sample_path)
+    audio_bytes = _parse_bitrate(audio_bitrate) / 8.0 * duration if streams_of(info, "audio") else 0
+    return int(video_bytes + audio_bytes)
+
+def compress_video(input_path, output_path, crf, max_width, audio_bitrate, target_bytes=None,
+                   workers=None, progress=None, cancel=None):
+    # Constant-quality (crf) encode capped at max_width, or with target_bytes a
+    # two-pass encode at the bitrate that fills exactly that size. Videos that
+    # would not get smaller are copied unchanged instead (checked first, see
+    # estimate_size). Returns details for the job result.
+    container = os.path.splitext(output_path)[1].lower().lstrip(".")
+    info = probe(input_path)
+    if not streams_of(info, "video"):
+        raise MediaError("This file has no video track!")
+    source_bytes = os.path.getsize(input_path)
+    audio = _audio_args(container, audio_bitrate)
+
+    if target_bytes:
+        details = {"target_bytes": target_bytes}
+        if source_bytes <= target_bytes:
+            shutil.copyfile(input_path, output_path)
+            return dict(details, skipped=True, target_met=True)
+        bitrate = _two_pass(input_path, output_path, container, info, max_width, audio, audio_bitrate,
+                            target_bytes, progress, cancel)
+        return dict(details, video_bitrate=bitrate, target_met=os.path.getsize(output_path) <= target_bytes)
+
+    video_args = COMPRESS_ENCODE + ["-crf", str(crf)] + _scale_args(max_width)
+    estimate = estimate_size(input_path, info, video_args, audio_bitrate, cancel)
+    if estimate is not None and estimate >= source_bytes * SKIP_RATIO:
+        shutil.copyfile(input_path, output_path)
+        return {"skipped": True, "estimate_bytes": estimate}
+
+    workers = segment_workers() if workers is None else workers
+    video = streams_of(info, "video")[0]
+    if not (segment_cuts(info["duration"], video.get("fps"), workers) and
+            segmented_transcode(input_path, output_path, container, info, workers, progress, cancel,
+                                video_args, audio)):
+        cmd = [find_ffmpeg(), "-hide_banner", "-loglevel", "error", "-y", "-i", input_path,
+               "-map", "0:v:0", "-map", "0:a?"] + video_args + audio + THREADS
+        if container in ("mp4", "mov"):
+            cmd += ["-movflags", "+faststart"]
+        run_ffmpeg(cmd + ["-f", _muxer(container), output_path], info["duration"], total_frames(info),
+                   progress, cancel)
+    if os.path.getsize(output_path) >= source_bytes:
+        # Too short to probe, or the estimate was off: the original is the smaller file
+        shutil.copyfile(input_path, output_path)
+        return {"skipped": True, "estimate_bytes": estimate}
+    return {"crf": crf, "estimate_bytes": estimate}
+
+def _two_pass(input_path, output_path, container, info, max_width, audio, audio_bitrate, target_bytes,
+              progress=None, cancel=None):
+    # Video bitrate = what is left of the size budget after audio and muxing overhead
+    duration = info["duration"]
+    if not duration:
+        raise MediaError("A target size needs the video's duration, which could not be read.")
+    has_audio = bool(streams_of(info, "audio"))
+    audio_bits = _parse_bitrate(audio_bitrate) * duration if has_audio else 0
+    packets = (total_frames(info) or duration * 30) + (AUDIO_PACKETS_PER_SECOND * duration if has_audio else 0)
+    overhead = packets * PACKET_OVERHEAD.get(container, DEFAULT_PACKET_OVERHEAD)
+    bitrate = int(((target_bytes - overhead) * 8 * RATE_HEADROOM - audio_bits) / duration)
+    if bitrate < 20000:
+        raise MediaError("The target size is too small for this video's length.")
+    ffmpeg = find_ffmpeg()
+    video_args = COMPRESS_ENCODE + ["-b:v", str(bitrate)] + _scale_args(max_width)
+    frames = total_frames(info)
+    log_dir = tempfile.mkdtemp(prefix="uc-2pass-", dir=os.path.dirname(os.path.abspath(output_path)))
+    try:
+        log = ["-passlogfile", os.path.join(log_dir, "pass")]
+        # Pass 1 only analyses: no audio, no output file
+        run_ffmpeg([ffmpeg, "-hide_banner", "-loglevel", "error", "-y", "-i", input_path, "-map", "0:v:0"]
+                   + video_args + THREADS + ["-pass", "1"] + log + ["-an", "-f", "null", os.devnull],
+                   duration, frames, _part(progress, 0.0, 0.5), cancel)
+        cmd = [ffmpeg, "-hide_banner", "-loglevel", "error", "-y", "-i", input_path,
+               "-map", "0:v:0", "-map", "0:a?"] + video_args + audio + THREADS + ["-pass", "2"] + log
+        if container in ("mp4", "mov"):
+            cmd += ["-movflags", "+faststart"]
+        run_ffmpeg(cmd + ["-f", _muxer(container), output_path], duration, frames, _part(progress, 0.5, 0.5), cancel)
+    finally:
+        shutil.rmtree(log_dir, ignore_errors=True)
+    return bitrate
+
+def _part(progress, start, span):
+    # progress callback for one step of a longer job
+    if not progress:
+        return None
+    return lambda fraction, detail: progress(start + fraction * span, detail)
+
+
+# --- FRAMES ---
+
+_PTS_RE = re.compile(r"pts_time:\s*(-?\d+(?:\.\d+)?)")
+
+def grab_frame(input_path, seconds, cancel=None, accurate=False):
+    # (PPM bytes, the frame's own timestamp) of one video frame, (b"", None) past
+    # the end. Input seek without accurate seeking: ffmpeg jumps to the keyframe
+    # at or before `seconds` and decodes just that frame, so the cost does not
+    # depend on where in the video it is. showinfo reports which frame it was.
+    # accurate=True decodes on from that keyframe to `seconds` (at most one GOP).
+    seek = ["-ss", f"{seconds:.3f}"] if accurate else ["-noaccurate_seek", "-ss", f"{seconds:.3f}"]
+    cmd = [find_ffmpeg(), "-hide_banner", "-loglevel", "info"] + seek + [
+           "-copyts", "-i", input_path, "-map", "0:v:0", "-an", "-sn", "-dn", "-frames:v", "1",
+           "-vf", "showinfo", "-f", "image2pipe", "-c:v", "ppm", "-pix_fmt", "rgb24", "-"]
+    if cancel is not None and cancel.is_set():
+        raise Cancelled("Cancelled")
+    proc = run_tool(cmd, text=False, stdin=subprocess.DEVNULL)
+    errors = proc.stderr.decode(errors="replace")
+    if proc.returncode != 0:
+        raise MediaError(errors.strip().splitlines()[-1] if errors.strip() else "ffmpeg failed")
+    match = _PTS_RE.search(errors)
+    return proc.stdout, float(match.group(1)) if match else None
+
+
+# --- AUDIO EXTRACTION ---
+
+def extract_audio(input_path, output_path, output_format, info=None, progress=None, cancel=None):
+    # Demuxes the first audio stream only: -vn keeps ffmpeg from opening a video
+    # decoder at all. Returns "copy" or "encode".
+    target = output_format.lower()
+    info = info or probe(input_path)
+    audios = streams_of(info, "audio")
+    if not audios:
+        # Known from the container probe, before any decoding starts
+        raise MediaError("This video file has no audio track!")
+
+    copy_codecs, encode_args = AUDIO_TARGETS[target]
+    copy = audios[0]["codec"] in copy_codecs
+    cmd = [find_ffmpeg(), "-hide_banner", "-loglevel", "error", "-y", "-i", input_path,
+           "-map", f"0:{audios[0]['index']}", "-vn", "-sn", "-dn", "-map_metadata", "-1"]
+    cmd += (["-c:a", "copy"] if copy else encode_args) + ["-f", target, output_path]
+    run_ffmpeg(cmd, info["duration"], None, progress, cancel)
+    return "copy" if copy else "encode"
+
+def _muxer(container):
+    return {"mkv": "matroska"}.get(container, container)
@@ -0,0 +1,50 @@
+import numpy as np
+
+# Perceptual similarity for quality-guided compression.
+# SSIM on luminance only, downsampled first, with box windows built from
+# shifted-slice sums in float32 - a few vectorized NumPy passes, cheaper than
+# the encode being scored.
+# Imported on first use (numpy must not load at GUI startup).
+
+# Scores are computed at most this wide
+SCORE_WIDTH = 768
+SSIM_WINDOW = 7
+
+_C1 = (0.01 * 255) ** 2
+_C2 = (0.03 * 255) ** 2
+
+
+def luminance(img, max_width=SCORE_WIDTH):
+    # Pillow image -> float32 luminance array, box-downsampled to max_width
+    from PIL import Image
+    gray = img if img.mode == "L" else img.convert("L")
+    if gray.width > max_width:
+        size = (max_width, max(1, int(gray.height * max_width / float(gray.width))))
+        gray = gray.resize(size, Image.Resampling.BOX)
+    return np.asarray(gray, dtype=np.float32)
+
+
+def _box_mean(x, w):
+    # Mean over every w x w window (valid positions only), separable
+    rows = x[:1 - w or None].copy()
+    for i in range(1, w):
+        rows += x[i:x.shape[0] - w + 1 + i]
+    out = rows[:, :1 - w or None].copy()
+    for i in range(1, w):
+        out += rows[:, i:rows.shape[1] - w + 1 + i]
+    return out / float(w * w)
+
+
+def ssim(a, b, window=SSIM_WINDOW):
+    # Mean SSIM of two equally sized luminance arrays (1.0 = identical)
+    if a.shape != b.shape:
+        raise ValueError("Images must have the same size")
+    if min(a.shape) < window:
+        return 1.0 if np.array_equal(a, b) else 0.0
+    mu_a, mu_b = _box_mean(a, window), _box_mean(b, window)
+    var_a = _box_mean(a * a, window) - mu_a * mu_a
+    var_b = _box_mean(b * b, window) - mu_b * mu_b
+    cov = _box_mean(a * b, window) - mu_a * mu_b
+    score = ((2 * mu_a * mu_b + _C1) * (2 * cov + _C2)) / \
+            ((mu_a * mu_a + mu_b * mu_b + _C1) * (var_a + var_b + _C2))
+    return float(score.mean(dtype=np.float64))
@@ -0,0 +1,297 @@
+import gc
+import os
+import shutil
+import hashlib
+import tempfile
+import io
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from PIL import Image
+from pypdf import PdfReader, PdfWriter
+from pypdf.generic import (ArrayObject, DictionaryObject, IndirectObject, NameObject, NumberObject,
+                           StreamObject)
+
+from .engine import atomic_output
+from .jobs import Cancelled, check_cancel, report
+
+# Page-parallel PDF compression.
+# The document is split into page ranges; each range is compressed by its own
+# PdfReader/PdfWriter (in a worker process when there are enough pages) and
+# written to a temp file, so decoded page content for at most one range per
+# worker is in memory at a time. The ranges are then streamed into the output
+# one by one and identical objects (shared fonts, repeated images/XObjects) are
+# written only once (see MergedPdf), so memory does not grow with page count.
+
+# Pages per range. Small enough to bound worker memory on scanned documents,
+# large enough that per-range overhead stays negligible.
+PDF_CHUNK_PAGES = 50
+
+# Bilevel codecs: re-encoding these as JPEG only makes them bigger
+_SKIP_FILTERS = {"/CCITTFaxDecode", "/JBIG2Decode"}
+
+
+def page_ranges(page_count, chunk_pages=PDF_CHUNK_PAGES):
+    return [(start, min(start + chunk_pages, page_count)) for start in range(0, page_count, chunk_pages)]
+
+
+def _compress_range(input_path, start, stop, chunk_path, quality=None, dpi=None, threads=1,
+                    progress=None, cancel=None, page_total=None):
+    # Top-level so it can be pickled into worker processes (progress/cancel are
+    # only passed when the range runs in-process).
+    # Returns the bytes saved on embedded images for each page of the range.
+    writer = PdfWriter()
+    # An open file is read lazily; a path would be read into memory whole
+    with open(input_path, "rb") as f:
+        writer.append(PdfReader(f), pages=(start, stop), import_outline=False)
+    for page in writer.pages:
+        check_cancel(cancel)
+        page.compress_content_streams()
+    page_savings = [0] * len(writer.pages)
+    if quality and dpi:
+        page_savings = recompress_images(writer, quality, dpi, threads, progress, cancel, start, page_total)
+    check_cancel(cancel)
+    writer.compress_identical_objects(remove_identicals=True, remove_orphans=True)
+    # Strip all metadata
+    writer.add_metadata({})
+    with open(chunk_path, "wb") as f:
+        writer.write(f)
+    del writer
+    # pypdf objects point back at their reader/writer: free this range before the next
+    gc.collect()
+    return page_savings
+
+
+# --- EMBEDDED IMAGES ---
+
+def _page_images(page):
+    # Image XObjects drawn directly by the page (images inside form XObjects are left alone)
+    resources = page.get("/Resources")
+    xobjects = resources.get_object().get("/XObject") if resources else None
+    if not xobjects:
+        return
+    for name, ref in xobjects.get_object().items():
+        obj = ref.get_object()
+        if obj.get("/Subtype") != "/Image" or obj.get("/ImageMask"):
+            continue
+        filters = obj.get("/Filter")
+        filters = filters if isinstance(filters, list) else [filters]
+        if any(f in _SKIP_FILTERS for f in filters):
+            continue
+        yield name, ref
+
+def _downsample(page, name, quality, max_width):
+    # Runs in a thread: decode (pypdf/Pillow), resize, encode as JPEG.
+    # Pillow releases the GIL for the heavy parts, so images overlap.
+    img = page.images[name].image
+    if img.width > max_width:
+        ratio = max_width / float(img.width)
+        size = (max_width, max(1, int(img.height * ratio)))
+        img = img.resize(size, Image.Resampling.LANCZOS, reducing_gap=2.0)
+    # Transparency stays in the XObject's own /SMask
+    if img.mode not in ("L", "RGB"):
+        img = img.convert("L" if img.mode in ("LA", "1", "I", "I;16") else "RGB")
+    buf = io.BytesIO()
+    img.save(buf, format="JPEG", quality=quality, optimize=True)
+    return buf.getvalue(), img.width, img.height, img.mode
+
+def _set_jpeg_stream(obj, data, width, height, mode):
+    # The StreamObject setter writes raw bytes; EncodedStreamObject.set_data
+    # would try to Flate-encode them again
+    StreamObject.set_data(obj, data)
+    if hasattr(obj, "decoded_self"):
+        obj.decoded_self = None
+    obj[NameObject("/Filter")] = NameObject("/DCTDecode")
+    obj[NameObject("/Width")] = NumberObject(width)
+    obj[NameObject("/Height")] = NumberObject(height)
+    obj[NameObject("/BitsPerComponent")] = NumberObject(8)
+    obj[NameObject("/ColorSpace")] = NameObject("/DeviceGray" if mode == "L" else "/DeviceRGB")
+    for key in ("/DecodeParms", "/Decode", "/Intent"):
+        obj.pop(key, None)
+
+def recompress_images(writer, quality, dpi, threads=1, progress=None, cancel=None, page_offset=0, page_total=None):
+    # Downsamples page images to `dpi` (measured against the page width, so an
+    # image never ends up below `dpi` where it is drawn) and re-encodes them at
+    # `quality`. An image is only replaced when the result is smaller.
+    # Progress is reported in pages of the whole document (page_offset/page_total).
+    jobs = {}
+    for index, page in enumerate(writer.pages):
+        max_width = max(1, int(float(page.mediabox.width) / 72.0 * dpi))
+        for name, ref in _page_images(page):
+            # An image shared by several pages is processed once, for the first page
+            key = ref.idnum if hasattr(ref, "idnum") else id(ref)
+            if key not in jobs:
+                jobs[key] = (index, page, name, ref.get_object(), max_width)
+
+    page_savings = [0] * len(writer.pages)
+    with ThreadPoolExecutor(max_workers=max(1, threads)) as pool:
+        futures = {pool.submit(_downsample, page, name, quality, max_width): (index, obj)
+                   for index, page, name, obj, max_width in jobs.values()}
+        # Futures were submitted in page order, so pages complete in order too
+        for future, (index, obj) in futures.items():
+            if cancel is not None and cancel.is_set():
+                pool.shutdown(wait=True, cancel_futures=True)
+                raise Cancelled("Cancelled")
+            try:
+                data, width, height, mode = future.result()
+            except Exception:
+                # Unsupported colour space / codec: keep the original image
+                continue
+            old_size = len(obj._data or b"")
+            if len(data) < old_size:
+                _set_jpeg_stream(obj, data, width, height, mode)
+                page_savings[index] += old_size - len(data)
+            report(progress, page_offset + index, page_total, f"page {page_offset + index + 1}/{page_total}")
+    return page_savings
+
+
+# --- MERGE ---
+
+class MergedPdf:
+    # Writes the pages of several PDFs into one file object, a file at a time.
+    # Objects are written as soon as they are read: an object is serialized after
+    # the objects it references, with those references already renumbered, so two
+    # objects with the same bytes are the same object and the second one is not
+    # written. Only the xref offsets and a hash index of written objects are kept.
+    def __init__(self, f):
+        self.f = f
+        self.offsets = [None, None, None]  # by object number; 1 = catalog, 2 = page tree
+        self.written = {}  # digest of serialized object -> object number
+        self.kids = []
+        f.write(b"%PDF-1.7\n%\xe2\xe3\xcf\xd3\n")
+
+    def _number(self):
+        self.offsets.append(None)
+        return len(self.offsets) - 1
+
+    def _write(self, number, data):
+        self.offsets[number] = self.f.tell()
+        self.f.write(b"%d 0 obj\n" % number + data + b"\nendobj\n")
+
+    def add(self, path):
+        with open(path, "rb") as f:
+            self._add(PdfReader(f))
+        # The reader's objects point back at it: free them before the next file
+        gc.collect()
+
+    def _add(self, reader):
+        # Pages are numbered first: links between pages resolve to them, and a
+        # page is never merged with an identical one
+        numbers = {page.indirect_reference.idnum: self._number() for page in reader.pages}
+        for page in reader.pages:
+            number = numbers[page.indirect_reference.idnum]
+            copy = self._remap(page, numbers, set(), skip=("/Parent",))
+            copy[NameObject("/Parent")] = IndirectObject(2, 0, None)
+            self._write(number, _serialize(copy))
+            self.kids.append(number)
+
+    def _copy(self, ref, numbers, visiting):
+        # Object number in the output of the object ref points to
+        idnum = ref.idnum
+        if idnum in numbers:
+            return numbers[idnum]
+        if idnum in visiting:
+            # Reference cycle: numbered now, written without dedup when its visit ends
+            numbers[idnum] = self._number()
+            return numbers[idnum]
+        visiting.add(idnum)
+        data = _serialize(self._remap(ref.get_object(), numbers, visiting))
+        visiting.discard(idnum)
+        if idnum in numbers:
+            self._write(numbers[idnum], data)
+            return numbers[idnum]
+        digest = hashlib.blake2b(data, digest_size=20).digest()
+        number = self.written.get(digest)
+        if number is None:
+            number = self.written[digest] = self._number()
+            self._write(number, data)
+        numbers[idnum] = number
+        return number
+
+    def _remap(self, obj, numbers, visiting, skip=()):
+        # Copy of obj with every reference renumbered (referenced objects are written first)
+        if isinstance(obj, IndirectObject):
+            return IndirectObject(self._copy(obj, numbers, visiting), 0, None)
+        if isinstance(obj, DictionaryObject):
+            copy = StreamObject() if isinstance(obj, StreamObject) else DictionaryObject()
+            if isinstance(obj, StreamObject):
+                copy._data = obj._data
+                skip += ("/Length",)  # written from the data
+            for key, value in obj.items():
+                if key not in skip:
+                    copy[key] = self._remap(value, numbers, visiting)
+            return copy
+        if isinstance(obj, ArrayObject):
+            return ArrayObject(self._remap(value, numbers, visiting) for value in obj)
+        return obj
+
+    def close(self):
+        kids = b" ".join(b"%d 0 R" % number for number in self.kids)
+        self._write(2, b"<< /Type /Pages /Count %d /Kids [%s] >>" % (len(self.kids), kids))
+        self._write(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+        xref = self.f.tell()
+        self.f.write(b"xref\n0 %d\n0000000000 65535 f \n" % len(self.offsets))
+        for offset in self.offsets[1:]:
+            self.f.write(b"%010d 00000 n \n" % offset)
+        self.f.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+                     % (len(self.offsets), xref))
+
+def _serialize(obj):
+    buf = io.BytesIO()
+    obj.write_to_stream(buf)
+    return buf.getvalue()
+
+
+def compress_pdf(input_path, output_path, quality=None, dpi=None, workers=None, chunk_pages=PDF_CHUNK_PAGES,
+                 progress=None, cancel=None):
+    # quality/dpi: embedded image settings (see recompress_images); None keeps images as they are.
+    # workers: cores to use (range processes x image threads); a batch job passes its share.
+    # progress(fraction, detail) is reported in pages; cancel is a threading.Event.
+    # Returns {"page_savings": [bytes saved on images, per page]}.
+    with open(input_path, "rb") as f:
+        page_count = len(PdfReader(f).pages)
+    ranges = page_ranges(page_count, chunk_pages)
+    # Inside a worker process that was not given a share: ranges one by one
+    # (the pool it runs in already uses every core)
+    cores = workers or (1 if multiprocessing.parent_process() is not None else os.cpu_count() or 1)
+
+    # Small documents: one range, no temp files, no pool
+    if len(ranges) <= 1:
+        with atomic_output(output_path) as tmp_path:
+            page_savings = _compress_range(input_path, 0, page_count, tmp_path, quality, dpi, cores,
+                                           progress, cancel, page_count)
+        report(progress, page_count, page_count, f"page {page_count}/{page_count}")
+        return {"page_savings": page_savings}
+
+    workers = max(1, min(cores, len(ranges)))
+    threads = max(1, cores // workers)
+
+    tmp_dir = tempfile.mkdtemp(prefix="uc-pdf-", dir=os.path.dirname(os.path.abspath(output_path)))
+    try:
+        chunk_paths = [os.path.join(tmp_dir, f"{i:05d}.pdf") for i in range(len(ranges))]
+        page_savings = []
+        if workers == 1:
+            for (start, stop), chunk_path in zip(ranges, chunk_paths):
+                page_savings += _compress_range(input_path, start, stop, chunk_path, quality, dpi, threads,
+                                                progress, cancel, page_count)
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(_compress_range, input_path, start, stop, chunk_path, quality, dpi, threads)
+                           for (start, stop), chunk_path in zip(ranges, chunk_paths)]
+                for future, (start, stop) in zip(futures, ranges):
+                    if cancel is not None and cancel.is_set():
+                        pool.shutdown(wait=True, cancel_futures=True)
+                        raise Cancelled("Cancelled")
+                    page_savings += future.result()
+                    report(progress, stop, page_count, f"page {stop}/{page_count}")
+        check_cancel(cancel)
+
+        # Merge: one range's already-compressed objects in memory at a time
+        with atomic_output(output_path) as tmp_path, open(tmp_path, "wb") as f:
+            merged = MergedPdf(f)
+            for chunk_path in chunk_paths:
+                check_cancel(cancel)
+                merged.add(chunk_path)
+            merged.close()
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return {"page_savings": page_savings}
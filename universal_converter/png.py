@@ -0,0 +1,229 @@
+import os
+import zlib
+import struct
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# PNG optimizer.
+# 1. Lossless colour reduction: opaque alpha is dropped, grey RGB becomes L,
+#    images with few colours become a palette (1/2/4/8 bit), all detected with
+#    vectorized NumPy checks.
+# 2. The rows are filtered with NumPy (filters predict from the original
+#    pixels, so every filter is a whole-array operation) and a few
+#    filter / zlib strategy pairs are compressed at level 9 in parallel threads
+#    (zlib releases the GIL). The smallest file wins.
+# "Extreme" first quantizes to 256 colours (quantize()), then goes through the same steps.
+# Imported on first use (numpy must not load at GUI startup).
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# Colour types
+GRAY, RGB, PALETTE, GRAY_ALPHA, RGBA = 0, 2, 3, 4, 6
+_CHANNELS = {GRAY: 1, RGB: 3, PALETTE: 1, GRAY_ALPHA: 2, RGBA: 4}
+
+# Filter types; ADAPTIVE picks one per row (smallest sum of absolute values, as libpng does)
+NONE, SUB, UP, AVERAGE, PAETH, ADAPTIVE = 0, 1, 2, 3, 4, 5
+
+# (filter, zlib strategy) trials, most likely winner first. Palette images rarely
+# gain from filtering and are cheap to try every way; truecolour trials are the
+# expensive ones, so only as many run as there are cores.
+PALETTE_TRIALS = [(NONE, zlib.Z_DEFAULT_STRATEGY), (NONE, zlib.Z_FILTERED),
+                  (ADAPTIVE, zlib.Z_DEFAULT_STRATEGY), (ADAPTIVE, zlib.Z_FILTERED)]
+TRUECOLOR_TRIALS = [(ADAPTIVE, zlib.Z_FILTERED), (ADAPTIVE, zlib.Z_DEFAULT_STRATEGY),
+                    (PAETH, zlib.Z_FILTERED), (NONE, zlib.Z_DEFAULT_STRATEGY),
+                    (PAETH, zlib.Z_DEFAULT_STRATEGY), (NONE, zlib.Z_FILTERED)]
+
+# Colours are only counted exactly when a sample of this many pixels has few enough
+_SAMPLE = 65536
+
+
+# --- COLOUR REDUCTION ---
+
+def reduce_image(img):
+    # Returns (color_type, bit_depth, pixels, palette, transparency) without losing anything:
+    # pixels is (h, w) or (h, w, channels) uint8; palette/transparency are bytes or None.
+    if img.mode == "1":
+        img = img.convert("L")
+    elif img.mode in ("P", "PA"):
+        # Re-derived below, which also drops unused palette entries
+        alpha = img.mode == "PA" or "transparency" in img.info or img.palette.mode == "RGBA"
+        img = img.convert("RGBA" if alpha else "RGB")
+    elif img.mode not in ("L", "LA", "RGB", "RGBA"):
+        raise ValueError(f"Unsupported mode {img.mode}")
+    pixels = np.asarray(img)
+
+    if img.mode in ("LA", "RGBA") and (pixels[..., -1] == 255).all():
+        pixels = pixels[..., :-1]
+    if pixels.ndim == 3 and pixels.shape[2] in (3, 4):
+        if (pixels[..., 0] == pixels[..., 1]).all() and (pixels[..., 1] == pixels[..., 2]).all():
+            pixels = pixels[..., [0, 3]] if pixels.shape[2] == 4 else pixels[..., 0]
+    if pixels.ndim == 3 and pixels.shape[2] == 1:
+        pixels = pixels[..., 0]
+
+    channels = 1 if pixels.ndim == 2 else pixels.shape[2]
+    color_type = {1: GRAY, 2: GRAY_ALPHA, 3: RGB, 4: RGBA}[channels]
+    # Grey only gains from a palette when it can drop below 8 bits
+    limit = 16 if color_type == GRAY else 256
+    palette = _to_palette(pixels, channels, limit)
+    if palette:
+        return palette
+    return color_type, 8, pixels, None, None
+
+def _pack(pixels, channels):
+    # One uint32 per pixel, for counting colours
+    if channels == 1:
+        return pixels.astype(np.uint32)
+    packed = np.zeros(pixels.shape[:2], dtype=np.uint32)
+    for c in range(channels):
+        packed = (packed << 8) | pixels[..., c]
+    return packed
+
+def _to_palette(pixels, channels, limit):
+    flat = _pack(pixels, channels).ravel()
+    if flat.size > _SAMPLE:
+        sample = flat[np.linspace(0, flat.size - 1, _SAMPLE).astype(np.intp)]
+        if np.unique(sample).size > limit:
+            return None
+    colors, inverse = np.unique(flat, return_inverse=True)
+    if colors.size > limit:
+        return None
+
+    # Unpack the colours back to (gray|r, g, b, alpha)
+    parts = [(colors >> (8 * (channels - 1 - c))) & 0xFF for c in range(channels)]
+    if channels in (1, 2):
+        rgb = [parts[0]] * 3
+    else:
+        rgb = parts[:3]
+    alpha = parts[-1] if channels in (2, 4) else np.full(colors.size, 255, dtype=np.uint32)
+
+    # Translucent entries first, so the tRNS chunk stays short
+    order = np.argsort(alpha == 255, kind="stable")
+    rank = np.empty_like(order)
+    rank[order] = np.arange(order.size)
+    indices = rank[inverse].reshape(pixels.shape[:2]).astype(np.uint8)
+
+    palette = np.stack(rgb, axis=1)[order].astype(np.uint8).tobytes()
+    translucent = int((alpha < 255).sum())
+    transparency = alpha[order][:translucent].astype(np.uint8).tobytes() if translucent else None
+    bit_depth = next(bits for bits in (1, 2, 4, 8) if colors.size <= 1 << bits)
+    return PALETTE, bit_depth, indices, palette, transparency
+
+
+# --- FILTERING ---
+
+def _raw_rows(pixels, bit_depth):
+    # (h, bytes per row) uint8; pixels below 8 bits are packed, leftmost in the high bits
+    h = pixels.shape[0]
+    rows = pixels.reshape(h, -1)
+    if bit_depth == 8:
+        return rows
+    per_byte = 8 // bit_depth
+    width = rows.shape[1]
+    padded = np.zeros((h, -(-width // per_byte) * per_byte), dtype=np.uint8)
+    padded[:, :width] = rows
+    groups = padded.reshape(h, -1, per_byte)
+    shifts = np.arange(per_byte - 1, -1, -1, dtype=np.uint8) * bit_depth
+    return (groups << shifts).sum(axis=2, dtype=np.uint16).astype(np.uint8)
+
+def filter_rows(raw, bpp, kind):
+    # Filtered scanlines as (h, 1 + row bytes) uint8, filter type byte first.
+    # Filters predict from the unfiltered neighbours, so each is one array expression.
+    x = raw.astype(np.int16)
+    a = np.zeros_like(x)
+    a[:, bpp:] = x[:, :-bpp]
+    b = np.zeros_like(x)
+    b[1:] = x[:-1]
+    if kind == NONE:
+        out = x
+    elif kind == SUB:
+        out = x - a
+    elif kind == UP:
+        out = x - b
+    elif kind == AVERAGE:
+        out = x - ((a + b) >> 1)
+    else:
+        c = np.zeros_like(x)
+        c[1:, bpp:] = x[:-1, :-bpp]
+        p = a + b - c
+        pa, pb, pc = np.abs(p - a), np.abs(p - b), np.abs(p - c)
+        out = x - np.where((pa <= pb) & (pa <= pc), a, np.where(pb <= pc, b, c))
+    out = (out & 0xFF).astype(np.uint8)
+    return np.hstack([np.full((raw.shape[0], 1), kind, dtype=np.uint8), out])
+
+def adaptive_rows(filtered):
+    # Per row, the filter whose bytes (read as signed) have the smallest absolute sum
+    rows = np.stack([filtered[kind] for kind in (NONE, SUB, UP, AVERAGE, PAETH)])
+    scores = np.abs(rows[:, :, 1:].view(np.int8).astype(np.int32)).sum(axis=2)
+    best = scores.argmin(axis=0)
+    return rows[best, np.arange(rows.shape[1])]
+
+
+# --- WRITING ---
+
+def chunk(tag, data):
+    return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+def _deflate(data, strategy):
+    compressor = zlib.compressobj(9, zlib.DEFLATED, 15, 9, strategy)
+    return compressor.compress(data) + compressor.flush()
+
+def encode_png(img, workers=None):
+    # Smallest PNG of img as bytes, plus {"color_type", "bit_depth", "filter", "strategy"}
+    color_type, bit_depth, pixels, palette, transparency = reduce_image(img)
+    raw = _raw_rows(pixels, bit_depth)
+    bpp = max(1, _CHANNELS[color_type] * bit_depth // 8)
+    if color_type == PALETTE or bit_depth < 8:
+        trials = PALETTE_TRIALS
+    else:
+        trials = TRUECOLOR_TRIALS[:max(1, workers or os.cpu_count() or 1)]
+
+    kinds = {kind for kind, _ in trials}
+    filtered = {kind: filter_rows(raw, bpp, kind) for kind in
+                ((NONE, SUB, UP, AVERAGE, PAETH) if ADAPTIVE in kinds else kinds)}
+    if ADAPTIVE in kinds:
+        filtered[ADAPTIVE] = adaptive_rows(filtered)
+    data = {kind: filtered[kind].tobytes() for kind in kinds}
+    del filtered
+    with ThreadPoolExecutor(max_workers=len(trials)) as pool:
+        results = list(pool.map(lambda t: _deflate(data[t[0]], t[1]), trials))
+    best = min(range(len(trials)), key=lambda i: len(results[i]))
+
+    header = struct.pack(">IIBBBBB", pixels.shape[1], pixels.shape[0], bit_depth, color_type, 0, 0, 0)
+    out = [PNG_SIGNATURE, chunk(b"IHDR", header)]
+    icc = img.info.get("icc_profile")
+    if icc:
+        out.append(chunk(b"iCCP", b"ICC\x00\x00" + zlib.compress(icc, 9)))
+    if palette:
+        out.append(chunk(b"PLTE", palette))
+    if transparency:
+        out.append(chunk(b"tRNS", transparency))
+    out += [chunk(b"IDAT", results[best]), chunk(b"IEND", b"")]
+    details = {"color_type": color_type, "bit_depth": bit_depth,
+               "filter": trials[best][0], "strategy": trials[best][1]}
+    return b"".join(out), details
+
+
+# --- LOSSY PALETTE (EXTREME) ---
+
+def quantize(img, colors=256, dither=True):
+    # 256-colour palette image. Median cut picks the palette (libimagequant when
+    # Pillow has it; k-means refinement costs ~30x the whole encode); opaque images
+    # are then remapped with Floyd-Steinberg dithering unless dither is False.
+    # Images that already have few enough colours are returned as they are (lossless).
+    from PIL import Image, features
+    if img.getcolors(colors) is not None:
+        return img
+    has_alpha = img.mode in ("RGBA", "LA", "PA") or \
+        (img.mode == "P" and ("transparency" in img.info or img.palette.mode == "RGBA"))
+    if has_alpha:
+        img = img.convert("RGBA")
+        method = Image.Quantize.LIBIMAGEQUANT if features.check_feature("libimagequant") else Image.Quantize.FASTOCTREE
+        return img.quantize(colors, method=method, dither=Image.Dither.FLOYDSTEINBERG if dither else Image.Dither.NONE)
+
+    img = img.convert("RGB")
+    if features.check_feature("libimagequant"):
+        palette = img.quantize(colors, method=Image.Quantize.LIBIMAGEQUANT)
+    else:
+        palette = img.quantize(colors, method=Image.Quantize.MEDIANCUT)
+    return img.quantize(palette=palette, dither=Image.Dither.FLOYDSTEINBERG if dither else Image.Dither.NONE)
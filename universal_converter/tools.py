@@ -0,0 +1,15 @@
+import subprocess
+
+# No console window flashing up on Windows when running from the GUI
+NO_WINDOW = getattr(subprocess, "CREATE_NO_WINDOW", 0)
+
+
+def run_tool(cmd, text=True, **kwargs):
+    # Runs an external tool (ffmpeg, ffprobe, jpegtran) to the end with stdout/stderr captured
+    if text:
+        kwargs.update(text=True, errors="replace")
+    return subprocess.run(cmd, capture_output=True, creationflags=NO_WINDOW, **kwargs)
+
+def popen_tool(cmd, **kwargs):
+    # Same, for tools whose output is followed while they run
+    return subprocess.Popen(cmd, creationflags=NO_WINDOW, **kwargs)
@@ -0,0 +1,381 @@
+import os
+import re
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .engine import format_bytes
+from .jobs import Cancelled, check_cancel
+
+# Youtube / yt_dlp downloader.
+# Accepts single URLs, URL lists, playlist/channel URLs and text files of URLs.
+# Items are downloaded by a pool of workers (one YoutubeDL instance each, they
+# are not thread-safe), every worker also fetches fragments concurrently.
+# yt_dlp itself is only imported when a download starts.
+
+# Map resolution string to height
+RES_MAP = {
+    "Best": 2160,
+    "4K": 2160,
+    "1080p": 1080,
+    "720p": 720,
+    "480p": 480,
+    "360p": 360
+}
+
+DEFAULT_WORKERS = 3
+DEFAULT_FRAGMENTS = 4
+
+# URLs that point at a list of videos rather than one video
+_LIST_URL_RE = re.compile(r"[?&]list=|/playlist\b|/@[^/]+|/channel/|/c/|/user/")
+_VIDEO_ID_RE = re.compile(r"(?:[?&]v=|youtu\.be/|/shorts/|/embed/|/live/)([\w-]{11})(?![\w-])")
+
+# Download index file kept in each save folder
+INDEX_NAME = ".uc_downloads.tsv"
+
+# yt_dlp calls the progress hook for every chunk it writes (hundreds of times
+# per second on a fast link); only one call per interval is passed on
+HOOK_INTERVAL = 0.1
+
+_ANSI_RE = re.compile(r'\x1b\[[0-9;]*m')
+
+
+def clean_ansi(text):
+    return _ANSI_RE.sub('', text)
+
+def format_eta(seconds):
+    if seconds is None:
+        return "..."
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
+
+
+# --- INPUT ---
+
+def parse_urls(source):
+    # source: a URL, several URLs separated by whitespace/newlines, a list of
+    # those, or the path of a .txt file with one URL per line (# comments allowed)
+    items = source if isinstance(source, (list, tuple)) else [source]
+    urls = []
+    for item in items:
+        item = item.strip()
+        if not item:
+            continue
+        if os.path.isfile(item):
+            with open(item, encoding="utf-8") as f:
+                urls += [line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")]
+        else:
+            urls += item.split()
+    # Keep order, drop duplicates
+    return list(dict.fromkeys(urls))
+
+def expand_playlists(urls, cancel=None):
+    # Playlist/channel URLs become their video URLs (flat listing, no per-video
+    # metadata requests). Plain video URLs are passed through untouched.
+    import yt_dlp
+
+    expanded = []
+    opts = {'extract_flat': 'in_playlist', 'quiet': True, 'no_warnings': True, 'skip_download': True}
+    with yt_dlp.YoutubeDL(opts) as ydl:
+        for url in urls:
+            check_cancel(cancel)
+            if not _LIST_URL_RE.search(url):
+                expanded.append(url)
+                continue
+            expanded += _entries(ydl, ydl.extract_info(url, download=False), cancel)
+    return list(dict.fromkeys(expanded))
+
+def _entries(ydl, info, cancel, depth=0):
+    if not info:
+        return []
+    if info.get('_type') not in ('playlist', 'multi_video'):
+        return [info.get('webpage_url') or info.get('url')]
+    urls = []
+    for entry in info.get('entries') or []:
+        check_cancel(cancel)
+        if not entry:
+            continue
+        # A channel lists its tabs (Videos, Shorts, ...) as nested playlists
+        if entry.get('_type') == 'playlist' or (entry.get('ie_key') == 'YoutubeTab' and depth < 2):
+            urls += _entries(ydl, ydl.extract_info(entry['url'], download=False), cancel, depth + 1)
+        else:
+            urls.append(entry.get('url') or entry.get('webpage_url'))
+    return [u for u in urls if u]
+
+
+def video_id_from_url(url):
+    # Youtube video ID straight from the URL, without asking the network
+    match = _VIDEO_ID_RE.search(url)
+    return match.group(1) if match else None
+
+
+# --- DOWNLOAD INDEX ---
+
+class DownloadIndex:
+    # Append-only, tab-separated log in the save folder, one line per finished download:
+    #   video_id  format  resolution  file name  size  unix time
+    # The last line for a key wins. prune() rewrites the file without stale lines.
+
+    def __init__(self, folder):
+        self.path = os.path.join(folder, INDEX_NAME)
+        self.folder = folder
+        self.entries = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    @staticmethod
+    def _key(video_id, video_format, resolution):
+        # Resolution does not matter for audio downloads
+        return (video_id, video_format, "-" if video_format == "mp3" else resolution)
+
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    parts = line.rstrip("\n").split("\t")
+                    if len(parts) != 6:
+                        continue
+                    video_id, fmt, res, name, size, stamp = parts
+                    self.entries[(video_id, fmt, res)] = (name, int(size), float(stamp))
+        except (OSError, ValueError):
+            pass
+
+    def lookup(self, video_id, video_format, resolution):
+        # Path of a finished download that is still on disk and complete, else None
+        entry = self.entries.get(self._key(video_id, video_format, resolution))
+        if not entry:
+            return None
+        path = os.path.join(self.folder, entry[0])
+        try:
+            return path if os.path.getsize(path) == entry[1] else None
+        except OSError:
+            return None
+
+    def record(self, video_id, video_format, resolution, path):
+        key = self._key(video_id, video_format, resolution)
+        entry = (os.path.relpath(path, self.folder), os.path.getsize(path), time.time())
+        with self._lock:
+            self.entries[key] = entry
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(self._line(key, entry))
+
+    @staticmethod
+    def _line(key, entry):
+        return "\t".join([*key, entry[0], str(entry[1]), f"{entry[2]:.0f}"]) + "\n"
+
+    def prune(self, max_age_days=None):
+        # Drops entries whose file is gone or changed (and, optionally, older ones)
+        # and compacts the log. Returns how many entries were removed.
+        cutoff = time.time() - max_age_days * 86400 if max_age_days else None
+        with self._lock:
+            keep = {}
+            for key, entry in self.entries.items():
+                path = os.path.join(self.folder, entry[0])
+                if cutoff and entry[2] < cutoff:
+                    continue
+                if not os.path.isfile(path) or os.path.getsize(path) != entry[1]:
+                    continue
+                keep[key] = entry
+            removed = len(self.entries) - len(keep)
+            self.entries = keep
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.writelines(self._line(key, entry) for key, entry in keep.items())
+            os.replace(tmp_path, self.path)
+        return removed
+
+
+# --- DOWNLOAD ---
+
+def build_ydl_opts(output_folder, video_format, resolution, fragments=DEFAULT_FRAGMENTS):
+    ydl_opts = {
+        'outtmpl': os.path.join(output_folder, '%(title)s.%(ext)s'),
+        'concurrent_fragment_downloads': fragments,
+        # An interrupted download leaves a .part file that is continued, not restarted
+        'continuedl': True,
+        'nopart': False,
+        'quiet': True,
+        'no_warnings': True,
+        # 'ffmpeg_location': 'C:/ffmpeg/bin/ffmpeg.exe' # Optional if not in PATH
+    }
+
+    if video_format == 'mp3':
+        ydl_opts['format'] = 'bestaudio/best'
+        ydl_opts['postprocessors'] = [{
+            'key': 'FFmpegExtractAudio',
+            'preferredcodec': 'mp3',
+            'preferredquality': '192',
+        }]
+    else:
+        # Video Mode (mp4/mkv)
+        target_height = RES_MAP.get(resolution, 2160)
+
+        # Format selection:
+        # "bestvideo[height<=?1080]+bestaudio/best[height<=?1080]"
+        # We try to match resolution. Extension is handled by merge_output_format
+        if resolution == "Best":
+            ydl_opts['format'] = "bestvideo+bestaudio/best"
+        else:
+            ydl_opts['format'] = f"bestvideo[height<={target_height}]+bestaudio/best[height<={target_height}]"
+
+        ydl_opts['merge_output_format'] = video_format
+    return ydl_opts
+
+def make_youtube_hook(on_progress, cancel, interval=HOOK_INTERVAL):
+    # yt_dlp progress hook; on_progress(fraction, detail) and the shared cancel token.
+    # Works from yt_dlp's numeric fields (no parsing of its coloured *_str fields).
+    # At most one call per `interval` is passed on; the latest one dropped inside a
+    # window is passed on when the window ends (trailing edge), so the progress
+    # shown before a stall is never stale. hook.stop() drops a pending one.
+    state = {"last": 0.0, "pending": None, "timer": None}
+    # Held while reporting so the timer thread and yt_dlp never report out of order
+    lock = threading.Lock()
+
+    def report_download(d):
+        state["last"] = time.monotonic()
+        done = d.get('downloaded_bytes') or 0
+        total = d.get('total_bytes') or d.get('total_bytes_estimate')
+        speed = d.get('speed')
+        detail = format_bytes(done) + (f" of {format_bytes(total)}" if total else "")
+        detail += f" | {format_bytes(speed) + '/s' if speed else 'N/A'} | ETA {format_eta(d.get('eta'))}"
+        on_progress(min(1.0, done / float(total)) if total else 0.0, detail)
+
+    def flush():
+        with lock:
+            d, state["pending"], state["timer"] = state["pending"], None, None
+            if d is not None:
+                report_download(d)
+
+    def stop():
+        with lock:
+            if state["timer"] is not None:
+                state["timer"].cancel()
+            state["pending"] = state["timer"] = None
+
+    def youtube_hook(d):
+        check_cancel(cancel)
+
+        if d['status'] == 'downloading':
+            with lock:
+                wait = interval - (time.monotonic() - state["last"])
+                if wait > 0:
+                    # yt_dlp reuses its status dict between calls
+                    state["pending"] = dict(d)
+                    if state["timer"] is None:
+                        state["timer"] = threading.Timer(wait, flush)
+                        state["timer"].daemon = True
+                        state["timer"].start()
+                    return
+                state["pending"] = None
+                report_download(d)
+
+        elif d['status'] == 'finished':
+            stop()
+            on_progress(1.0, "Download complete. Processing...")
+
+    youtube_hook.stop = stop
+    return youtube_hook
+
+def download_one(url, ydl_opts, on_progress, cancel, index=None, video_format=None, resolution=None):
+    # Downloads one item. With a DownloadIndex, an item already downloaded in this
+    # format/resolution is skipped before yt_dlp (and the network) is touched.
+    check_cancel(cancel)
+    video_id = video_id_from_url(url)
+    if index is not None and video_id:
+        done = index.lookup(video_id, video_format, resolution)
+        if done:
+            on_progress(1.0, "Already downloaded")
+            return f"Skipped: already downloaded ({os.path.basename(done)})"
+
+    import yt_dlp
+
+    # Final file and ID, known once yt_dlp has run its postprocessors
+    seen = {"id": video_id, "path": None}
+
+    def remember_id(d):
+        seen["id"] = seen["id"] or (d.get('info_dict') or {}).get('id')
+
+    def remember_path(path):
+        seen["path"] = path
+
+    hook = make_youtube_hook(on_progress, cancel)
+    opts = dict(ydl_opts, progress_hooks=[hook, remember_id], post_hooks=[remember_path])
+    try:
+        with yt_dlp.YoutubeDL(opts) as ydl:
+            ydl.download([url])
+    except Cancelled:
+        raise
+    except Exception as e:
+        # yt_dlp wraps exceptions raised inside hooks
+        if cancel is not None and cancel.is_set():
+            raise Cancelled("Cancelled")
+        return f"Error: {str(e)}"
+    finally:
+        # No progress for this item after its result
+        hook.stop()
+
+    if index is not None and seen["id"] and seen["path"] and os.path.isfile(seen["path"]):
+        index.record(seen["id"], video_format, resolution, seen["path"])
+    return "Download Successful!"
+
+def download_youtube_logic(urls, output_folder, video_format, resolution, workers=DEFAULT_WORKERS,
+                           fragments=DEFAULT_FRAGMENTS, progress=None, cancel=None, on_item=None, use_index=True):
+    # urls: anything parse_urls() accepts. on_item(index, url, result) is called
+    # as each item finishes. Returns {"ok", "error", "items": [{"url", "result"}]}.
+    # use_index: skip items recorded in the folder's DownloadIndex.
+    try:
+        check_cancel(cancel)
+        urls = expand_playlists(parse_urls(urls), cancel)
+    except Cancelled:
+        raise
+    except Exception as e:
+        return {"ok": False, "error": f"Error: {str(e)}", "items": []}
+    if not urls:
+        return {"ok": False, "error": "Error: No URL given", "items": []}
+
+    ydl_opts = build_ydl_opts(output_folder, video_format, resolution, fragments)
+    download_index = DownloadIndex(output_folder) if use_index else None
+    items = [{"url": url, "result": None} for url in urls]
+    fractions = [0.0] * len(urls)
+    lock = threading.Lock()
+
+    def item_progress(index):
+        def on_progress(fraction, detail):
+            with lock:
+                fractions[index] = fraction
+                finished = sum(1 for item in items if item["result"] is not None)
+                overall = sum(fractions) / len(fractions)
+            if progress:
+                prefix = f"{finished}/{len(items)} done | " if len(items) > 1 else ""
+                progress(overall, prefix + detail)
+        return on_progress
+
+    def run(index):
+        result = download_one(urls[index], ydl_opts, item_progress(index), cancel,
+                              download_index, video_format, resolution)
+        with lock:
+            items[index]["result"] = result
+            fractions[index] = 1.0
+        if on_item:
+            on_item(index, urls[index], result)
+        return result
+
+    workers = max(1, min(workers, len(urls)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="uc-yt") as pool:
+        futures = [pool.submit(run, i) for i in range(len(urls))]
+        cancelled = False
+        for future in futures:
+            try:
+                future.result()
+            except Cancelled:
+                cancelled = True
+    if cancelled:
+        raise Cancelled("Cancelled")
+
+    failed = [item for item in items if item["result"] and item["result"].startswith("Error")]
+    error = None
+    if failed:
+        error = failed[0]["result"] if len(items) == 1 else \
+            f"Error: {len(failed)} of {len(items)} downloads failed. First: {failed[0]['url']}: {failed[0]['result']}"
+    return {"ok": not failed, "error": error, "items": items}